@@ -0,0 +1,38 @@
+"""
+Shared fixtures for the API behaviour tests.
+
+The tests run the app modules against a real MongoDB (MONGO_URL, MongoDB 4.4+) in a throwaway
+database that is dropped before and after every test. They are skipped when no server is reachable.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+# App modules import each other as top-level modules (`from database import db`)
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+# Must be set before database is imported: the connection manager reads them at import time
+os.environ["MONGO_DB_NAME"] = os.getenv("TEST_MONGO_DB_NAME", "skilllink_test")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+os.environ.setdefault("MONGO_WARMUP_CONNECTIONS", "0")
+
+
+@pytest_asyncio.fixture
+async def test_db():
+    from database import mongo, db, MONGO_URL, MONGO_DB_NAME
+
+    try:
+        await mongo.client.admin.command("ping")
+    except Exception:
+        await mongo.close()
+        pytest.skip(f"MongoDB is not reachable at {MONGO_URL}")
+
+    await mongo.client.drop_database(MONGO_DB_NAME)
+    yield db
+    await mongo.client.drop_database(MONGO_DB_NAME)
+    # Motor binds the client to the running event loop, and every test gets a fresh loop
+    await mongo.close()
@@ -0,0 +1,34 @@
+"""
+Tests that the operational /admin endpoints are limited to admins
+"""
+
+import httpx
+import pytest
+
+import auth
+from main import app
+
+
+def as_user(user_type: str):
+    async def current_user():
+        return {"id": "0" * 24, "email": f"{user_type}@example.com", "user_type": user_type}
+    return current_user
+
+
+@pytest.fixture
+def client():
+    yield httpx.AsyncClient(app=app, base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/admin/db/pool-stats", "/admin/message-buffer/stats"])
+async def test_admin_stats_require_an_admin(client, path):
+    async with client:
+        assert (await client.get(path)).status_code == 401
+
+        app.dependency_overrides[auth.get_current_user] = as_user("player")
+        assert (await client.get(path)).status_code == 403
+
+        app.dependency_overrides[auth.get_current_user] = as_user("admin")
+        assert (await client.get(path)).status_code == 200
@@ -0,0 +1,49 @@
+"""
+Tests for the analytics rollup rebuild
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import analytics
+
+
+async def bucket_values(db, metric: str, granularity: str):
+    rows = db[analytics.ROLLUPS_COLLECTION].find({"metric": metric, "granularity": granularity})
+    return {row["bucket"]: row["value"] async for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_buckets_by_hour_and_day(test_db):
+    await analytics.ensure_indexes()
+    await test_db["gigs"].insert_many([
+        {"created_at": datetime(2024, 3, 1, 9, 15)},
+        {"created_at": datetime(2024, 3, 1, 9, 45)},
+        {"created_at": datetime(2024, 3, 1, 17, 0)},
+        {"created_at": datetime(2024, 3, 2, 0, 30)},
+        {"title": "imported without a timestamp"},
+    ])
+
+    await analytics.rebuild_rollups(metrics=["gigs_created"])
+
+    assert await bucket_values(test_db, "gigs_created", "hour") == {
+        datetime(2024, 3, 1, 9): 2, datetime(2024, 3, 1, 17): 1, datetime(2024, 3, 2, 0): 1
+    }
+    assert await bucket_values(test_db, "gigs_created", "day") == {datetime(2024, 3, 1): 3, datetime(2024, 3, 2): 1}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_since_clears_buckets_without_source_rows(test_db):
+    await analytics.ensure_indexes()
+    await test_db["gigs"].insert_one({"created_at": datetime(2024, 3, 1, 9, 15)})
+    # Incremental counts for a gig that has since been deleted, before and after `since`
+    await analytics.record("gigs_created", at=datetime(2024, 2, 1, 12, tzinfo=timezone.utc))
+    await analytics.record("gigs_created", at=datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc))
+    await analytics.record("gigs_created", at=datetime(2024, 3, 5, 8, tzinfo=timezone.utc))
+
+    # Not on a bucket boundary: the whole 2024-03-01 day bucket is still rebuilt
+    await analytics.rebuild_rollups(since=datetime(2024, 3, 1, 9, 40, tzinfo=timezone.utc), metrics=["gigs_created"])
+
+    assert await bucket_values(test_db, "gigs_created", "day") == {datetime(2024, 2, 1): 1, datetime(2024, 3, 1): 1}
+    assert await bucket_values(test_db, "gigs_created", "hour") == {datetime(2024, 2, 1, 12): 1, datetime(2024, 3, 1, 9): 1}
@@ -0,0 +1,182 @@
+"""
+Tests for access token verification and password hashing
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import auth
+from auth import TokenCache
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    auth.token_cache.clear()
+    calls = []
+    decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+    yield calls
+    auth.token_cache.clear()
+
+
+def access_token(user_id: str) -> str:
+    return auth.create_access_token({"id": user_id, "email": "p@example.com", "user_type": "player", "username": "p"})
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_reuse_the_verified_claims(decode_calls):
+    user_id = str(ObjectId())
+    token = access_token(user_id)
+
+    first = await auth.get_current_user(token)
+    # A handler mutating its user dict must not leak into the next request
+    first["user_type"] = "admin"
+    second = await auth.get_current_user(token)
+
+    assert decode_calls == [token]
+    assert second["id"] == user_id and second["_id"] == ObjectId(user_id)
+    assert second["user_type"] == "player"
+
+
+@pytest.mark.asyncio
+async def test_expired_cached_token_is_rejected(decode_calls):
+    token = access_token(str(ObjectId()))
+    await auth.get_current_user(token)
+    claims = auth.token_cache.get(token)
+    auth.token_cache.put(token, claims, time.time() - 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.get_current_user(token)
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Token has expired."
+    # The stale entry is gone
+    assert auth.token_cache.get(token) is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_not_cached(decode_calls):
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await auth.get_current_user("not-a-jwt")
+    assert decode_calls == ["not-a-jwt", "not-a-jwt"]
+
+
+def test_token_cache_evicts_the_least_recently_used_entry():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"id": "a"}, None)
+    cache.put("b", {"id": "b"}, None)
+    cache.get("a")
+    cache.put("c", {"id": "c"}, None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"} and cache.get("c") == {"id": "c"}
+
+    disabled = TokenCache(max_size=0)
+    disabled.put("a", {"id": "a"}, None)
+    assert disabled.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def slow_hash(password):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(auth, "hash_password", slow_hash)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        assert await auth.hash_password_async("secret") == "hashed:secret"
+    finally:
+        ticking.cancel()
+    assert threads[0].startswith("password-hash")
+    # The loop kept serving other work while the hash ran
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_sheds_load_beyond_the_queue_limit(monkeypatch):
+    release = threading.Event()
+
+    def blocked_hash(password):
+        release.wait(5)
+        return password
+
+    monkeypatch.setattr(auth, "hash_password", blocked_hash)
+    monkeypatch.setattr(auth, "PASSWORD_HASH_QUEUE_LIMIT", 2)
+
+    queued = [asyncio.create_task(auth.hash_password_async(str(i))) for i in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.hash_password_async("one too many")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "1"
+
+    release.set()
+    assert await asyncio.gather(*queued) == ["0", "1"]
+    # Finished work frees its slot
+    assert auth._hash_pending == 0
+    assert await auth.hash_password_async("next") == "next"
+
+
+async def login_with_stored_hash(test_db, hashed_password: str) -> dict:
+    user = {"_id": ObjectId(), "email": "p@example.com", "user_type": "player", "hashed_password": hashed_password}
+    await test_db["users"].insert_one(user)
+    await auth.login(email="p@example.com", password="secret")
+    return await test_db["users"].find_one({"_id": user["_id"]})
+
+
+@pytest.mark.asyncio
+async def test_login_upgrades_a_hash_with_an_outdated_cost(test_db, monkeypatch):
+    old_hash = auth.build_password_context(schemes=["bcrypt"], rounds=4).hash("secret")
+    monkeypatch.setattr(auth, "pwd_context", auth.build_password_context(schemes=["bcrypt"], rounds=5))
+
+    user = await login_with_stored_hash(test_db, old_hash)
+    assert user["hashed_password"].startswith("$2b$05$")
+    assert auth.verify_password("secret", user["hashed_password"])
+
+    # Current hashes are left alone
+    await auth.login(email="p@example.com", password="secret")
+    assert (await test_db["users"].find_one({"_id": user["_id"]}))["hashed_password"] == user["hashed_password"]
+
+
+@pytest.mark.asyncio
+async def test_login_migrates_a_deprecated_scheme(test_db, monkeypatch):
+    old_hash = auth.build_password_context(schemes=["pbkdf2_sha256"]).hash("secret")
+    monkeypatch.setattr(auth, "pwd_context", auth.build_password_context(schemes=["bcrypt", "pbkdf2_sha256"], rounds=4))
+
+    user = await login_with_stored_hash(test_db, old_hash)
+    assert user["hashed_password"].startswith("$2b$04$")
+
+
+@pytest.mark.asyncio
+async def test_wrong_password_does_not_rehash(test_db, monkeypatch):
+    old_hash = auth.build_password_context(schemes=["bcrypt"], rounds=4).hash("secret")
+    monkeypatch.setattr(auth, "pwd_context", auth.build_password_context(schemes=["bcrypt"], rounds=5))
+    user = {"_id": ObjectId(), "email": "p@example.com", "user_type": "player", "hashed_password": old_hash}
+    await test_db["users"].insert_one(user)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.login(email="p@example.com", password="wrong")
+    assert exc_info.value.status_code == 401
+    assert (await test_db["users"].find_one({"_id": user["_id"]}))["hashed_password"] == old_hash
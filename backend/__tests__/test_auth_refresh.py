@@ -0,0 +1,70 @@
+"""
+Tests for refresh token rotation and reuse detection
+"""
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import auth
+
+
+async def create_user(test_db, password="correct horse"):
+    user = {
+        "_id": ObjectId(), "email": "player@example.com", "username": "player",
+        "user_type": "player", "hashed_password": auth.hash_password(password),
+    }
+    await test_db["users"].insert_one(user)
+    return user
+
+
+async def assert_refresh_rejected(refresh_token: str):
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.refresh_tokens(refresh_token=refresh_token)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_the_token_pair(test_db):
+    await auth.ensure_indexes()
+    user = await create_user(test_db)
+    login = await auth.login(email=user["email"], password="correct horse")
+    assert login["expires_in"] == int(auth.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+    rotated = await auth.refresh_tokens(refresh_token=login["refresh_token"])
+    assert rotated["refresh_token"] != login["refresh_token"]
+    assert auth.decode_access_token(rotated["access_token"])["id"] == str(user["_id"])
+
+    # The new refresh token keeps working; the session stays one family
+    again = await auth.refresh_tokens(refresh_token=rotated["refresh_token"])
+    assert await test_db["refresh_tokens"].count_documents({}) == 3
+    assert len(await test_db["refresh_tokens"].distinct("family_id")) == 1
+    assert again["refresh_token"] not in (login["refresh_token"], rotated["refresh_token"])
+
+
+@pytest.mark.asyncio
+async def test_reusing_a_rotated_token_revokes_the_session(test_db):
+    await auth.ensure_indexes()
+    user = await create_user(test_db)
+    login = await auth.login(email=user["email"], password="correct horse")
+    other_session = await auth.login(email=user["email"], password="correct horse")
+    rotated = await auth.refresh_tokens(refresh_token=login["refresh_token"])
+
+    await assert_refresh_rejected(login["refresh_token"])
+    # The replay ended the whole chain, including the token handed out by the rotation
+    await assert_refresh_rejected(rotated["refresh_token"])
+    # Other logins of the same user are unaffected
+    await auth.refresh_tokens(refresh_token=other_session["refresh_token"])
+
+
+@pytest.mark.asyncio
+async def test_refresh_rejects_access_and_malformed_tokens(test_db):
+    await auth.ensure_indexes()
+    user = await create_user(test_db)
+    login = await auth.login(email=user["email"], password="correct horse")
+
+    await assert_refresh_rejected(login["access_token"])
+    await assert_refresh_rejected("not-a-jwt")
+    # Refresh tokens are not accepted where an access token is expected
+    with pytest.raises(HTTPException):
+        auth.decode_access_token(login["refresh_token"])
@@ -0,0 +1,36 @@
+"""
+Tests for the CPU count shared by start.py and the thumbnail pool
+"""
+
+import io
+import os
+
+import pytest
+
+import cpus
+
+
+def cpu_max(contents):
+    def fake_open(path, *args, **kwargs):
+        if contents is None:
+            raise FileNotFoundError(path)
+        return io.StringIO(contents)
+    return fake_open
+
+
+@pytest.fixture
+def eight_cpus(monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+
+@pytest.mark.parametrize("contents, expected", [
+    (None, 8),                 # No cgroup v2 controller
+    ("max 100000\n", 8),       # Unlimited quota
+    ("200000 100000\n", 2),    # Two CPUs worth of quota
+    ("150000 100000\n", 2),    # Fractional quotas round up
+    ("10000 100000\n", 1),     # Never below one
+    ("garbage\n", 8),
+])
+def test_cgroup_quota_narrows_the_affinity_mask(eight_cpus, monkeypatch, contents, expected):
+    monkeypatch.setattr(cpus, "open", cpu_max(contents), raising=False)
+    assert cpus.available_cpus() == list(range(expected))
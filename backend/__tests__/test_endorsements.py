@@ -0,0 +1,126 @@
+"""
+Tests for endorsement keyset pagination and the one-endorsement-per-org aggregates
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import endorsements
+from reputation import reputation_fields
+from schemas import EndorsementCreate
+
+
+async def page_through(user_id: ObjectId, limit: int, sort_by: str, order: str, **filters):
+    seen, cursor = [], None
+    while True:
+        page = await endorsements.view_endorsements(
+            user_id=str(user_id), page=1, limit=limit, cursor=cursor,
+            endorsed_by=None, min_rating=filters.get("min_rating"), max_rating=None,
+            created_before=None, created_after=None, sort_by=sort_by, order=order
+        )
+        seen += [e["id"] for e in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+async def insert_endorsements(db, player_id: ObjectId):
+    # Ties on both sort keys: three share a timestamp, ratings repeat
+    same_time = datetime(2024, 5, 1, 12, 0, 0, 250000)
+    docs = [
+        {"created_at": same_time, "rating": 4},
+        {"created_at": same_time, "rating": 5},
+        {"created_at": same_time, "rating": 4},
+        {"created_at": datetime(2024, 5, 2, 8, 30), "rating": 3},
+        {"created_at": datetime(2024, 4, 30, 23, 59, 59, 999000), "rating": 5},
+        {"created_at": datetime(2024, 5, 3), "rating": 4},
+        {"created_at": datetime(2024, 5, 3, 0, 0, 1), "rating": 1},
+    ]
+    docs = [{"_id": ObjectId(), "endorsed_id": player_id, "endorsed_by": ObjectId(), **doc} for doc in docs]
+    await db["endorsements"].insert_many(docs)
+    # Someone else's endorsements must never leak into the pages
+    await db["endorsements"].insert_one({"endorsed_id": ObjectId(), "endorsed_by": ObjectId(), "created_at": same_time, "rating": 4})
+    return docs
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by", ["created_at", "rating"])
+@pytest.mark.parametrize("order", ["desc", "asc"])
+async def test_cursor_pages_cover_every_endorsement_once(test_db, sort_by, order):
+    await endorsements.ensure_indexes()
+    player_id = ObjectId()
+    docs = await insert_endorsements(test_db, player_id)
+
+    reverse = order == "desc"
+    expected = [str(d["_id"]) for d in sorted(docs, key=lambda d: (d[sort_by], d["_id"]), reverse=reverse)]
+
+    for limit in (1, 2, 3, len(docs)):
+        assert await page_through(player_id, limit, sort_by, order) == expected
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_respect_filters(test_db):
+    player_id = ObjectId()
+    docs = await insert_endorsements(test_db, player_id)
+
+    expected = [
+        str(d["_id"]) for d in sorted(docs, key=lambda d: (d["rating"], d["_id"]), reverse=True) if d["rating"] >= 4
+    ]
+    assert await page_through(player_id, 2, "rating", "desc", min_rating=4) == expected
+
+
+def test_cursor_round_trips():
+    endorsement_id = ObjectId()
+    created_at = datetime(2024, 5, 1, 12, 0, 0, 250000)
+    doc = {"_id": endorsement_id, "created_at": created_at, "rating": 4}
+
+    assert endorsements.decode_cursor(endorsements.encode_cursor(doc, "created_at"), "created_at") == (created_at, endorsement_id)
+    assert endorsements.decode_cursor(endorsements.encode_cursor(doc, "rating"), "rating") == (4, endorsement_id)
+
+
+async def endorse(org_id: ObjectId, player_id: ObjectId, rating: int):
+    return await endorsements.endorse_user(
+        EndorsementCreate(endorsed_id=str(player_id), rating=rating),
+        {"id": str(org_id), "user_type": "org"}
+    )
+
+
+async def player_aggregates(db, player_id: ObjectId):
+    return await db["users"].find_one({"_id": player_id}, {"endorsement_count": 1, "rating_sum": 1, "rating_histogram": 1, "_id": 0})
+
+
+@pytest.mark.asyncio
+async def test_re_endorsement_replaces_the_rating_and_delete_reverses_it(test_db):
+    await endorsements.ensure_indexes()
+    player_id, org_id, other_org_id = ObjectId(), ObjectId(), ObjectId()
+    await test_db["users"].insert_one({"_id": player_id, "user_type": "player", **reputation_fields(0, 0)})
+
+    first = await endorse(org_id, player_id, 3)
+    await endorse(other_org_id, player_id, 4)
+    assert await player_aggregates(test_db, player_id) == {
+        "endorsement_count": 2, "rating_sum": 7, "rating_histogram": {"1": 0, "2": 0, "3": 1, "4": 1, "5": 0}
+    }
+
+    # Same org again: the rating moves from 3 to 5 in place, the count does not change
+    second = await endorse(org_id, player_id, 5)
+    assert second["id"] == first["id"]
+    assert await test_db["endorsements"].count_documents({"endorsed_id": player_id}) == 2
+    assert await player_aggregates(test_db, player_id) == {
+        "endorsement_count": 2, "rating_sum": 9, "rating_histogram": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}
+    }
+
+    # Re-endorsing with an unchanged rating leaves the aggregates alone
+    await endorse(org_id, player_id, 5)
+    assert (await player_aggregates(test_db, player_id))["rating_sum"] == 9
+
+    await endorsements.delete_endorsement(second["id"], {"id": str(org_id), "user_type": "org"})
+    assert await player_aggregates(test_db, player_id) == {
+        "endorsement_count": 1, "rating_sum": 4, "rating_histogram": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}
+    }
+    # A repeated delete finds nothing and must not subtract twice
+    with pytest.raises(HTTPException):
+        await endorsements.delete_endorsement(second["id"], {"id": str(org_id), "user_type": "org"})
+    assert (await player_aggregates(test_db, player_id))["endorsement_count"] == 1
@@ -0,0 +1,83 @@
+"""
+Tests for the group-commit chat message buffer (the MongoDB write itself is replaced)
+"""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+import message_buffer
+from message_buffer import MessageWriteBuffer
+
+
+@pytest.fixture
+def written(monkeypatch):
+    batches = []
+
+    async def write_messages(batch):
+        batches.append([message["text"] for message, _ in batch])
+
+    monkeypatch.setattr(message_buffer, "write_messages", write_messages)
+    return batches
+
+
+def chat_message(text: str):
+    return {"conversation_id": ObjectId(), "sender_id": ObjectId(), "text": text}
+
+
+@pytest.mark.asyncio
+async def test_flushes_as_soon_as_the_batch_is_full(written):
+    buffer = MessageWriteBuffer(flush_window_ms=60_000, max_batch=3)
+
+    # Would wait a minute for the window; the third message fills the batch instead
+    await asyncio.wait_for(asyncio.gather(*(buffer.submit(chat_message(str(i)), []) for i in range(3))), timeout=1)
+
+    assert written == [["0", "1", "2"]]
+    assert buffer.stats()["batches_written"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flushes_a_partial_batch_after_the_window(written):
+    buffer = MessageWriteBuffer(flush_window_ms=20, max_batch=100)
+
+    first = asyncio.create_task(buffer.submit(chat_message("a"), []))
+    second = asyncio.create_task(buffer.submit(chat_message("b"), []))
+    await asyncio.sleep(0)
+    assert written == [] and not first.done()
+
+    await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+    assert written == [["a", "b"]]
+
+    # The window restarts for the next burst
+    await asyncio.wait_for(buffer.submit(chat_message("c"), []), timeout=1)
+    assert written == [["a", "b"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_messages(written):
+    buffer = MessageWriteBuffer(flush_window_ms=60_000, max_batch=100)
+
+    pending = asyncio.create_task(buffer.submit(chat_message("bye"), []))
+    await asyncio.sleep(0)
+    assert written == []
+
+    await buffer.close()
+
+    message = await asyncio.wait_for(pending, timeout=1)
+    assert written == [["bye"]]
+    assert isinstance(message["_id"], ObjectId)
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_raised_to_every_waiter(monkeypatch):
+    async def write_messages(batch):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(message_buffer, "write_messages", write_messages)
+    buffer = MessageWriteBuffer(flush_window_ms=1, max_batch=100)
+
+    results = await asyncio.gather(*(buffer.submit(chat_message(str(i)), []) for i in range(2)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,29 @@
+"""
+Tests for the message search backfill
+"""
+
+import pytest
+from bson import ObjectId
+
+import message_search
+
+
+@pytest.mark.asyncio
+async def test_backfill_indexes_every_message_in_batches(test_db, monkeypatch):
+    monkeypatch.setattr(message_search, "BACKFILL_BATCH_SIZE", 3)
+    await message_search.ensure_indexes()
+    alice, bob = ObjectId(), ObjectId()
+    convo = {"_id": ObjectId(), "participants": [alice, bob]}
+    await test_db["conversations"].insert_one(convo)
+    await test_db["messages"].insert_many(
+        [{"conversation_id": convo["_id"], "text": f"message number {i}"} for i in range(5)]
+        + [{"conversation_id": convo["_id"], "text": "!"}]  # No terms, no postings
+    )
+
+    assert await message_search.backfill_search_index() == 10
+    # Re-running upserts the same postings
+    assert await message_search.backfill_search_index() == 10
+    assert await test_db[message_search.SEARCH_COLLECTION].count_documents({}) == 10
+
+    hits = await message_search.search_messages(bob, "number", limit=10)
+    assert len(hits["results"]) == 5
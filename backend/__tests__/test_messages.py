@@ -0,0 +1,139 @@
+"""
+Tests for direct conversation lookup by pair key, the pair key backfill and the conversation list
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+
+import message_search
+import messages
+
+
+@pytest.mark.asyncio
+async def test_pair_key_is_order_independent(test_db):
+    await messages.ensure_indexes()
+    alice, bob = ObjectId(), ObjectId()
+
+    first = await messages.get_or_create_conversation(alice, bob)
+    second = await messages.get_or_create_conversation(bob, alice)
+
+    assert first["_id"] == second["_id"]
+    assert first["pair_key"] == messages.conversation_pair_key(bob, alice)
+    assert await test_db["conversations"].count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_starts_converge_on_one_conversation(test_db):
+    await messages.ensure_indexes()
+    alice, bob = ObjectId(), ObjectId()
+
+    conversations = await asyncio.gather(*(
+        messages.get_or_create_conversation(*((alice, bob) if i % 2 else (bob, alice))) for i in range(10)
+    ))
+
+    assert len({c["_id"] for c in conversations}) == 1
+    assert await test_db["conversations"].count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_backfill_merges_duplicate_threads_into_the_oldest(test_db):
+    alice, bob, carol = ObjectId(), ObjectId(), ObjectId()
+    oldest = {
+        "_id": ObjectId(), "participants": [alice, bob],
+        "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 2)
+    }
+    duplicate = {
+        "_id": ObjectId(), "participants": [bob, alice],
+        "created_at": datetime(2024, 1, 3), "updated_at": datetime(2024, 1, 5),
+        "last_message": {"text": "latest", "sender_id": bob, "created_at": datetime(2024, 1, 5)}
+    }
+    other = {
+        "_id": ObjectId(), "participants": [alice, carol],
+        "created_at": datetime(2024, 1, 4), "updated_at": datetime(2024, 1, 4)
+    }
+    await test_db["conversations"].insert_many([duplicate, oldest, other])
+    await test_db["messages"].insert_many([
+        {"conversation_id": oldest["_id"], "text": "hi"},
+        {"conversation_id": duplicate["_id"], "text": "latest"},
+        {"conversation_id": other["_id"], "text": "hey"},
+    ])
+    await message_search.backfill_search_index()
+
+    assert await messages.backfill_pair_keys() == 3
+    # The unique index can be built once the duplicates are gone
+    await messages.ensure_indexes()
+
+    remaining = {c["_id"]: c async for c in test_db["conversations"].find()}
+    assert set(remaining) == {oldest["_id"], other["_id"]}
+    merged = remaining[oldest["_id"]]
+    assert merged["pair_key"] == messages.conversation_pair_key(alice, bob)
+    assert merged["updated_at"] == duplicate["updated_at"]
+    assert merged["last_message"]["text"] == "latest"
+    assert remaining[other["_id"]]["pair_key"] == messages.conversation_pair_key(alice, carol)
+    assert await test_db["messages"].count_documents({"conversation_id": oldest["_id"]}) == 2
+    assert await test_db["messages"].count_documents({"conversation_id": other["_id"]}) == 1
+
+    # Search postings of the merged thread point at the surviving conversation
+    postings = test_db[message_search.SEARCH_COLLECTION]
+    assert await postings.count_documents({"conversation_id": duplicate["_id"]}) == 0
+    assert await postings.count_documents({"conversation_id": oldest["_id"]}) == 4  # 2 messages x 2 participants
+
+
+@pytest.mark.asyncio
+async def test_mark_as_read_resets_unread_count(test_db):
+    alice, bob = ObjectId(), ObjectId()
+    convo = await messages.get_or_create_conversation(alice, bob)
+    await test_db["conversations"].update_one({"_id": convo["_id"]}, {"$set": {f"unread_counts.{bob}": 3}})
+    await test_db["messages"].insert_one({"conversation_id": convo["_id"], "text": "hi", "read_by": [alice]})
+
+    await messages.mark_conversation_as_read(str(convo["_id"]), {"id": str(bob)})
+
+    convo = await test_db["conversations"].find_one({"_id": convo["_id"]})
+    assert convo["unread_counts"][str(bob)] == 0
+    assert await test_db["messages"].count_documents({"read_by": bob}) == 1
+
+
+async def list_all_conversations(user_id: ObjectId, limit: int):
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = await messages.get_my_conversations(
+            response=response, limit=limit, offset=0, cursor=cursor, current_user={"id": str(user_id)}
+        )
+        seen += [convo["id"] for convo in page]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.asyncio
+async def test_conversation_cursor_pages_cover_every_conversation_once(test_db):
+    await messages.ensure_indexes()
+    alice = ObjectId()
+    await test_db["users"].insert_one({"_id": alice, "username": "alice"})
+    same_time = datetime(2024, 6, 1, 12, 0, 0, 500000)
+    times = [same_time, same_time, same_time, datetime(2024, 6, 2), datetime(2024, 5, 1), datetime(2024, 6, 1, 12, 0, 1)]
+    convos = [
+        {"_id": ObjectId(), "participants": [alice, ObjectId()], "created_at": at, "updated_at": at}
+        for at in times
+    ]
+    await test_db["conversations"].insert_many(convos)
+    # Conversations alice is not part of never show up
+    await test_db["conversations"].insert_one({"participants": [ObjectId(), ObjectId()], "updated_at": same_time})
+
+    expected = [str(c["_id"]) for c in sorted(convos, key=lambda c: (c["updated_at"], c["_id"]), reverse=True)]
+    for limit in (1, 2, 4, len(convos)):
+        assert await list_all_conversations(alice, limit) == expected
+
+
+@pytest.mark.asyncio
+async def test_invalid_conversation_cursor_is_rejected(test_db):
+    with pytest.raises(HTTPException) as exc_info:
+        await messages.get_my_conversations(
+            response=Response(), limit=20, offset=0, cursor="not-a-cursor", current_user={"id": str(ObjectId())}
+        )
+    assert exc_info.value.status_code == 400
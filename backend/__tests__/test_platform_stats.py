@@ -0,0 +1,65 @@
+"""
+Tests for the materialized platform counters behind /admin/stats
+"""
+
+import pytest
+
+from platform_stats import PlatformStats, STATS_COLLECTION, STATS_DOCUMENT_ID, user_counters
+
+
+async def seed(test_db):
+    await test_db["users"].insert_many([
+        {"user_type": "player"}, {"user_type": "player"}, {"user_type": "org"}, {"user_type": "admin"}
+    ])
+    await test_db["gigs"].insert_many([{}, {}])
+    await test_db["applications"].insert_one({})
+
+
+@pytest.mark.asyncio
+async def test_first_read_recounts_the_collections(test_db):
+    await seed(test_db)
+
+    stats = await PlatformStats().get()
+
+    assert stats == {
+        "users_total": 4, "players": 2, "orgs": 1, "gigs": 2,
+        "applications": 1, "endorsements": 0, "nfts_minted": 0
+    }
+    stored = await test_db[STATS_COLLECTION].find_one({"_id": STATS_DOCUMENT_ID})
+    assert stored["recounted_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_increments_are_read_back_once_the_ttl_expires(test_db):
+    await seed(test_db)
+    cached = PlatformStats(ttl_seconds=60)
+    uncached = PlatformStats(ttl_seconds=0)
+    await cached.get()
+
+    await cached.increment(**user_counters("org"))
+    await cached.increment(gigs=1)
+
+    assert (await cached.get())["orgs"] == 1  # Still within the TTL
+    fresh = await uncached.get()
+    assert (fresh["users_total"], fresh["orgs"], fresh["gigs"]) == (5, 2, 3)
+
+
+@pytest.mark.asyncio
+async def test_drift_is_clamped_and_corrected_by_a_recount(test_db):
+    await seed(test_db)
+    stats = PlatformStats(ttl_seconds=0)
+    await stats.get()
+
+    # Decrements for rows that were never counted, e.g. deleted outside the API
+    await stats.increment(endorsements=-3)
+    assert (await stats.get())["endorsements"] == 0
+
+    await test_db["endorsements"].insert_one({})
+    assert (await stats.recount())["endorsements"] == 1
+    assert (await stats.get())["endorsements"] == 1
+
+
+def test_user_counters_follow_the_user_type():
+    assert user_counters("player") == {"users_total": 1, "players": 1}
+    assert user_counters("org") == {"users_total": 1, "orgs": 1}
+    assert user_counters(None) == {"users_total": 1}
@@ -0,0 +1,98 @@
+"""
+Tests for the /players directory keyset pagination and the leaderboard ranks
+"""
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import players
+from reputation import reputation_fields
+
+
+async def page_through(limit: int, **filters):
+    seen, cursor = [], None
+    while True:
+        page = await players.search_players(
+            games=filters.get("games"), location=filters.get("location"),
+            min_rating=filters.get("min_rating"), limit=limit, cursor=cursor
+        )
+        seen += [p["id"] for p in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.asyncio
+async def test_pages_from_endorsed_into_unendorsed_players(test_db):
+    endorsed = [
+        {"_id": ObjectId(), "username": f"endorsed{i}", "user_type": "player", **reputation_fields(count, count * 5)}
+        for i, count in enumerate([4, 2, 2])
+    ]
+    # Registered before the reputation backfill: no reputation field at all
+    unendorsed = [{"_id": ObjectId(), "username": f"new{i}", "user_type": "player"} for i in range(3)]
+    await test_db["users"].insert_many(endorsed + unendorsed)
+    await test_db["users"].insert_one({"username": "org", "user_type": "org"})
+
+    expected = [str(endorsed[0]["_id"])]
+    # Equal reputation: ties break on _id, newest first
+    expected += sorted((str(p["_id"]) for p in endorsed[1:]), reverse=True)
+    expected += sorted((str(p["_id"]) for p in unendorsed), reverse=True)
+
+    for limit in (1, 2, 4, 6):
+        assert await page_through(limit) == expected
+
+
+def test_cursor_round_trips_missing_reputation():
+    player_id = ObjectId()
+    assert players.decode_cursor(players.encode_cursor({"_id": player_id})) == (None, player_id)
+    assert players.decode_cursor(players.encode_cursor({"_id": player_id, "reputation": 3.5})) == (3.5, player_id)
+
+
+@pytest.fixture
+def fresh_leaderboards():
+    players._leaderboards.clear()
+    yield
+    players._leaderboards.clear()
+
+
+@pytest.mark.asyncio
+async def test_rank_lookup_matches_the_board_across_ties(test_db, fresh_leaderboards):
+    ranked = [
+        {"_id": ObjectId(), "username": f"p{i}", "user_type": "player", "games": games, **reputation_fields(count, count * 4)}
+        for i, (count, games) in enumerate([(3, ["Valorant"]), (1, ["Valorant", "Dota 2"]), (1, ["Dota 2"]), (1, ["Valorant"]), (8, ["Dota 2"])])
+    ]
+    unranked = {"_id": ObjectId(), "username": "new", "user_type": "player", "games": ["Valorant"], **reputation_fields(0, 0)}
+    await test_db["users"].insert_many(ranked + [unranked])
+
+    for game in (None, "Valorant", "Dota 2"):
+        board = (await players.get_leaderboard(game=game, limit=100))["results"]
+        eligible = [p for p in ranked if game is None or game in p["games"]]
+        # Reputation descending, equal reputations newest _id first
+        assert [entry["id"] for entry in board] == [
+            str(p["_id"]) for p in sorted(eligible, key=lambda p: (p["reputation"], p["_id"]), reverse=True)
+        ]
+        assert [entry["rank"] for entry in board] == list(range(1, len(eligible) + 1))
+        for entry in board:
+            assert (await players.get_leaderboard_rank(entry["id"], game=game))["rank"] == entry["rank"]
+
+    # Below LEADERBOARD_MIN_ENDORSEMENTS, or not playing the game: not ranked
+    with pytest.raises(HTTPException) as exc_info:
+        await players.get_leaderboard_rank(str(unranked["_id"]), game=None)
+    assert exc_info.value.status_code == 404
+    with pytest.raises(HTTPException):
+        await players.get_leaderboard_rank(str(ranked[0]["_id"]), game="Dota 2")
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_limit_slices_the_cached_board(test_db, fresh_leaderboards):
+    await test_db["users"].insert_many([
+        {"_id": ObjectId(), "username": f"p{i}", "user_type": "player", **reputation_fields(i + 1, (i + 1) * 5)}
+        for i in range(5)
+    ])
+    top = await players.get_leaderboard(game=None, limit=2)
+    assert top["count"] == 2 and [e["rank"] for e in top["results"]] == [1, 2]
+
+    # Served from the cache until the TTL expires, even after new players qualify
+    await test_db["users"].insert_one({"username": "late", "user_type": "player", **reputation_fields(50, 250)})
+    assert (await players.get_leaderboard(game=None, limit=10))["count"] == 5
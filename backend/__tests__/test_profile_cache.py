@@ -0,0 +1,103 @@
+"""
+Tests for the public profile cache: hits, ETag revalidation and invalidation
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+
+import auth
+from main import app
+from profile_cache import ProfileCache, profile_cache
+
+
+@pytest_asyncio.fixture
+async def client():
+    profile_cache._entries.clear()
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+    profile_cache._entries.clear()
+
+
+async def insert_player(test_db, **fields) -> ObjectId:
+    user_id = ObjectId()
+    await test_db["users"].insert_one(
+        {"_id": user_id, "username": "ana", "email": "ana@example.com", "user_type": "player", **fields}
+    )
+    return user_id
+
+
+def log_in_as(user_id: ObjectId):
+    async def current_user():
+        return {"_id": user_id, "id": str(user_id), "email": "ana@example.com", "user_type": "player"}
+    app.dependency_overrides[auth.get_current_user] = current_user
+
+
+@pytest.mark.asyncio
+async def test_repeat_reads_are_served_from_the_cache_and_revalidated(client, test_db):
+    user_id = await insert_player(test_db, bio="first")
+    first = await client.get(f"/users/{user_id}")
+    assert first.json()["bio"] == "first"
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+
+    # A direct database edit bypasses invalidation: the cached body is served until the TTL
+    await test_db["users"].update_one({"_id": user_id}, {"$set": {"bio": "edited"}})
+    hits = profile_cache.hits
+    cached = await client.get(f"/users/{user_id}")
+    assert profile_cache.hits == hits + 1
+    assert cached.content == first.content and cached.headers["ETag"] == etag
+
+    not_modified = await client.get(f"/users/{user_id}", headers={"If-None-Match": f'W/{etag}'})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_profile_update_invalidates_the_cached_profile(client, test_db):
+    user_id = await insert_player(test_db, bio="first")
+    etag = (await client.get(f"/users/{user_id}")).headers["ETag"]
+
+    log_in_as(user_id)
+    assert (await client.patch("/me", json={"bio": "second"})).status_code == 200
+
+    # The old ETag no longer matches and the new body is served
+    response = await client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["bio"] == "second"
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_org_route_does_not_serve_a_cached_player(client, test_db):
+    user_id = await insert_player(test_db)
+    assert (await client.get(f"/users/{user_id}")).status_code == 200
+    assert (await client.get(f"/orgs/{user_id}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_invalidations_reach_other_workers_and_entries_expire():
+    other_worker = ProfileCache()
+    await other_worker.start()
+    await asyncio.sleep(0)  # Let the listener subscribe
+    try:
+        other_worker.put("a", b"{}", "player")
+        other_worker.put("b", b"{}", "player")
+        other_worker.put("c", b"{}", "player")
+
+        await profile_cache.invalidate("a")
+        await profile_cache.invalidate_many(["b"])
+        await asyncio.sleep(0.01)
+        assert other_worker.get("a") is None and other_worker.get("b") is None
+        assert other_worker.get("c") is not None
+    finally:
+        await other_worker.stop()
+
+    expired = ProfileCache(ttl_seconds=0)
+    expired.put("a", b"{}", "player")
+    assert expired.get("a") is None
@@ -0,0 +1,97 @@
+"""
+Tests for the pub/sub brokers and the backend selection
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+
+import pubsub
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+
+async def next_event(queue: asyncio.Queue):
+    return await asyncio.wait_for(queue.get(), timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_broker_delivers_to_channel_subscribers_only():
+    broker = pubsub.InMemoryBroker()
+    async with broker.subscribe("user:a") as first, broker.subscribe("user:a") as second, broker.subscribe("user:b") as other:
+        await broker.publish("user:a", {"n": 1})
+        assert await next_event(first) == {"n": 1}
+        assert await next_event(second) == {"n": 1}
+        assert other.empty()
+    # Unsubscribing drops the channel
+    await broker.publish("user:a", {"n": 2})
+    assert "user:a" not in broker._subscribers
+
+
+def backend_for(**env) -> str:
+    environ = {k: v for k, v in os.environ.items() if k not in ("PUBSUB_BACKEND", "WEB_CONCURRENCY")}
+    result = subprocess.run(
+        [sys.executable, "-c", "import pubsub; print(pubsub.PUBSUB_BACKEND, type(pubsub.broker).__name__)"],
+        cwd=APP_DIR, env={**environ, **env}, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.split()
+
+
+def test_backend_follows_worker_count_unless_set():
+    assert backend_for() == ["memory", "InMemoryBroker"]
+    assert backend_for(WEB_CONCURRENCY="4") == ["mongo", "MongoBroker"]
+    assert backend_for(WEB_CONCURRENCY="4", PUBSUB_BACKEND="memory") == ["memory", "InMemoryBroker"]
+    with pytest.raises(ValueError):
+        pubsub.create_broker("redis")
+
+
+@pytest.mark.asyncio
+async def test_mongo_broker_delivers_events_published_after_start(test_db, monkeypatch):
+    monkeypatch.setattr(pubsub, "PUBSUB_RETRY_SECONDS", 0.01)
+    # Published while no worker of this generation was running, e.g. before a restart
+    previous = pubsub.MongoBroker("pubsub_test")
+    await previous.start()
+    await previous.publish("user:a", {"n": 0})
+    await previous.stop()
+
+    broker = pubsub.MongoBroker("pubsub_test")
+    await broker.start()
+    try:
+        async with broker.subscribe("user:a") as queue:
+            await broker.publish("user:b", {"n": 1})
+            await broker.publish("user:a", {"n": 2})
+            assert await next_event(queue) == {"n": 2}
+            assert queue.empty()
+    finally:
+        await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_mongo_broker_resumes_by_insertion_order_after_cursor_restart(test_db, monkeypatch):
+    monkeypatch.setattr(pubsub, "PUBSUB_RETRY_SECONDS", 0.01)
+    broker = pubsub.MongoBroker("pubsub_test")
+    await broker.start()
+    try:
+        async with broker.subscribe("user:a") as queue:
+            await broker.publish("user:a", {"n": 1})
+            assert await next_event(queue) == {"n": 1}
+            # Wait for the tail cursor to die and be reopened (empty result sets end it on some servers)
+            await asyncio.sleep(0.1)
+
+            # Another worker's ObjectId can sort below ones already seen, e.g. a lagging clock
+            behind = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=5))
+            await test_db["pubsub_test"].insert_one({"_id": behind, "channel": "user:a", "event": {"n": 2}})
+            await broker.publish("user:a", {"n": 3})
+            assert await next_event(queue) == {"n": 2}
+            assert await next_event(queue) == {"n": 3}
+            await asyncio.sleep(0.1)
+            # Nothing is delivered twice after further restarts
+            assert queue.empty()
+    finally:
+        await broker.stop()
@@ -0,0 +1,135 @@
+"""
+Tests for the token-bucket rate limiter
+"""
+
+from datetime import timedelta
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+import rate_limit
+from rate_limit import Limit, MemoryBuckets, MongoBuckets, RateLimitMiddleware, RateLimitRule
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_allows_burst_then_refills(clock):
+    buckets = MemoryBuckets()
+    limit = Limit(rate=1, burst=3)
+
+    assert [(await buckets.consume("k", limit))[0] for _ in range(4)] == [True, True, True, False]
+
+    clock.now += 1
+    assert (await buckets.consume("k", limit))[0] is True
+    assert (await buckets.consume("k", limit))[0] is False
+
+    # Refill is capped at the burst size
+    clock.now += 60
+    assert [(await buckets.consume("k", limit))[0] for _ in range(4)] == [True, True, True, False]
+    # Buckets are independent per key
+    assert (await buckets.consume("other", limit))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_mongo_bucket_allows_burst_then_refills(test_db):
+    buckets = MongoBuckets()
+    limit = Limit(rate=1, burst=2)
+
+    assert [(await buckets.consume("k", limit))[0] for _ in range(3)] == [True, True, False]
+
+    # Age the bucket by two seconds instead of sleeping
+    bucket = await test_db[MongoBuckets.collection].find_one({"_id": "k"})
+    await test_db[MongoBuckets.collection].update_one(
+        {"_id": "k"}, {"$set": {"updated_at": bucket["updated_at"] - timedelta(seconds=2)}}
+    )
+    assert [(await buckets.consume("k", limit))[0] for _ in range(3)] == [True, True, False]
+
+
+async def ok_app(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+@pytest.mark.asyncio
+async def test_middleware_returns_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "buckets", MemoryBuckets())
+    app = RateLimitMiddleware(ok_app, rules=[
+        RateLimitRule({"POST"}, "/auth/login", per_ip=Limit.per_minute(60, 2), per_account=Limit.per_minute(60, 1))
+    ])
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        # Unlimited routes and methods pass straight through
+        assert (await client.get("/auth/login")).status_code == 200
+
+        # Per account: the second login for the same email is rejected, another email is not
+        assert (await client.post("/auth/login", data={"email": "a@example.com"})).status_code == 200
+        rejected = await client.post("/auth/login", data={"email": "A@example.com"})
+        assert rejected.status_code == 429
+        assert rejected.headers["Retry-After"] == "1"
+
+        # Per IP: the burst of two is now spent
+        rejected = await client.post("/auth/login", data={"email": "b@example.com"})
+        assert rejected.status_code == 429
+
+        clock.now += 1
+        assert (await client.post("/auth/login", data={"email": "b@example.com"})).status_code == 200
+
+
+async def echo_length_app(scope, receive, send):
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    await PlainTextResponse(str(len(body)))(scope, receive, send)
+
+
+@pytest.mark.asyncio
+async def test_oversized_login_body_is_keyed_on_the_ip_and_still_delivered(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "buckets", MemoryBuckets())
+    monkeypatch.setattr(rate_limit, "LOGIN_BODY_LIMIT", 64)
+    app = RateLimitMiddleware(echo_length_app, rules=[
+        RateLimitRule({"POST"}, "/auth/login", per_account=Limit.per_minute(60, 1))
+    ])
+    padding = "x" * 100
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        # Content-Length over the cap: the body is not read by the limiter at all
+        response = await client.post("/auth/login", data={"email": "a@example.com", "pad": padding})
+        assert response.status_code == 200
+        assert int(response.text) > 100
+        # The fallback bucket is the client's IP, whatever email the next oversized form names
+        rejected = await client.post("/auth/login", data={"email": "b@example.com", "pad": padding})
+        assert rejected.status_code == 429
+
+        # Streamed without Content-Length: reading stops at the cap and the rest is passed through
+        clock.now += 1
+
+        async def chunks():
+            yield b"email=c%40example.com&pad="
+            for _ in range(10):
+                yield b"y" * 20
+
+        response = await client.post(
+            "/auth/login", content=chunks(), headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response.status_code == 200
+        assert int(response.text) == len("email=c%40example.com&pad=") + 200
+        # That request spent the IP bucket too, while a small form is still keyed on its email
+        rejected = await client.post("/auth/login", data={"email": "d@example.com", "pad": padding})
+        assert rejected.status_code == 429
+        assert (await client.post("/auth/login", data={"email": "d@example.com"})).status_code == 200
@@ -0,0 +1,123 @@
+"""
+Tests for the incremental reputation aggregates and the batch tier evaluator
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+import reputation_tiers
+from profile_cache import profile_cache
+from reputation import apply_endorsement, reputation_fields
+from reputation_tiers import evaluate_tiers
+
+
+async def create_player(db, **fields):
+    player_id = ObjectId()
+    await db["users"].insert_one({"_id": player_id, "username": "player", "user_type": "player", **fields})
+    return player_id
+
+
+def aggregates(doc):
+    return {k: doc[k] for k in ("endorsement_count", "rating_sum", "rating_histogram", "avg_rating", "reputation")}
+
+
+def expected(ratings):
+    histogram = {str(r): ratings.count(r) for r in set(ratings)}
+    fields = reputation_fields(len(ratings), sum(ratings), histogram)
+    del fields["reputation_tier"]  # Left to the batch evaluator
+    return fields
+
+
+@pytest.mark.asyncio
+async def test_new_endorsements_match_a_full_recompute(test_db):
+    player_id = await create_player(test_db, **reputation_fields(0, 0))
+
+    ratings = []
+    for rating in (5, 4, 4, 1, 5):
+        ratings.append(rating)
+        player = await apply_endorsement(player_id, rating)
+        assert aggregates(player) == expected(ratings)
+
+    assert player["avg_rating"] == 3.8
+    # Bayesian average: (19 + 3.0 * 5) / (5 + 5)
+    assert player["reputation"] == 3.4
+    stored = await test_db["users"].find_one({"_id": player_id})
+    assert stored["reputation_updated_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_first_endorsement_of_a_player_without_aggregates(test_db):
+    # Players created before the aggregates existed have none of the fields
+    player_id = await create_player(test_db)
+
+    player = await apply_endorsement(player_id, 3)
+
+    assert aggregates(player) == expected([3])
+    assert player["rating_histogram"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}
+
+
+@pytest.mark.asyncio
+async def test_removing_the_last_endorsement_resets_the_average(test_db):
+    player_id = await create_player(test_db, **reputation_fields(0, 0))
+    await apply_endorsement(player_id, 2)
+
+    player = await apply_endorsement(player_id, previous_rating=2)
+
+    assert aggregates(player) == expected([])
+    assert player["avg_rating"] is None
+    assert player["reputation"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_unknown_player_is_not_created(test_db):
+    assert await apply_endorsement(ObjectId(), 5) is None
+    assert await test_db["users"].count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_tier_changes_invalidate_cached_profiles(test_db):
+    unchanged_id = await create_player(test_db, **reputation_fields(0, 0))
+    player_id = await create_player(test_db, **reputation_fields(0, 0))
+    for rating in (5, 5, 5):
+        await apply_endorsement(player_id, rating)
+    for user_id in (player_id, unchanged_id):
+        profile_cache.put(str(user_id), b"{}", "player")
+
+    result = await evaluate_tiers()
+
+    assert result["changed"] == 1
+    assert (await test_db["users"].find_one({"_id": player_id}))["reputation_tier"] == "Gold SkillLink Talent"
+    assert profile_cache.get(str(player_id)) is None
+    assert profile_cache.get(str(unchanged_id)) is not None
+
+
+@pytest.mark.asyncio
+async def test_player_stamped_during_a_scan_is_picked_up_by_the_next_run(test_db, monkeypatch):
+    now = datetime.now(timezone.utc)
+    # Scanned first, while its stamp is still older than the run's lower bound
+    late_id = await create_player(test_db, **reputation_fields(0, 0), reputation_updated_at=now - timedelta(days=1))
+    seen_id = await create_player(test_db, **reputation_fields(3, 15), reputation_updated_at=now)
+    await test_db["users"].update_one({"_id": seen_id}, {"$set": {"reputation_tier": None}})
+
+    write_batch = reputation_tiers._write_batch
+
+    async def endorse_during_scan(batch):
+        # An endorsement whose $$NOW was taken just before the stamp already read for seen_id
+        await test_db["users"].update_one(
+            {"_id": late_id},
+            {"$set": {**reputation_fields(3, 15), "reputation_tier": None, "reputation_updated_at": now - timedelta(seconds=1)}}
+        )
+        return await write_batch(batch)
+
+    monkeypatch.setattr(reputation_tiers, "REPUTATION_TIER_BATCH_SIZE", 1)
+    monkeypatch.setattr(reputation_tiers, "_write_batch", endorse_during_scan)
+    first = await evaluate_tiers(since=now - timedelta(minutes=10))
+    monkeypatch.setattr(reputation_tiers, "_write_batch", write_batch)
+
+    assert first["high_water"] <= now - timedelta(seconds=1)
+    await evaluate_tiers(since=first["high_water"])
+
+    for player_id in (seen_id, late_id):
+        assert (await test_db["users"].find_one({"_id": player_id}))["reputation_tier"] == "Gold SkillLink Talent"
@@ -0,0 +1,152 @@
+"""
+Tests for serving content-addressed uploads and for the S3 storage backend against moto's in-process S3
+"""
+
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+
+import storage
+
+BUCKET = "skilllink-test"
+NAME = f"{'a' * storage.CONTENT_HASH_LENGTH}.png"
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    mock_s3 = getattr(moto, "mock_aws", None) or moto.mock_s3  # moto 5 renamed it
+    for variable in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(variable, "testing")
+    monkeypatch.setattr(storage, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(storage, "S3_ENDPOINT_URL", None)
+
+    with mock_s3():
+        s3 = storage.S3Storage()
+        s3.client.create_bucket(Bucket=BUCKET)
+        yield s3
+
+
+@pytest_asyncio.fixture
+async def uploads_client(tmp_path):
+    (tmp_path / NAME).write_bytes(b"0123456789")
+    (tmp_path / "legacy.png").write_bytes(b"legacy")
+    async with httpx.AsyncClient(app=storage.UploadStaticFiles(directory=tmp_path), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_content_addressed_uploads_are_immutable_with_a_strong_etag(uploads_client):
+    response = await uploads_client.get(f"/{NAME}")
+    etag = f'"{NAME.split(".")[0]}"'
+    assert response.content == b"0123456789"
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == storage.IMMUTABLE_CACHE_CONTROL
+
+    revalidated = await uploads_client.get(f"/{NAME}", headers={"If-None-Match": f'"other", {etag}'})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    # Legacy names can be overwritten in place, so they are never marked immutable
+    legacy = await uploads_client.get("/legacy.png")
+    assert legacy.content == b"legacy"
+    assert "immutable" not in legacy.headers.get("Cache-Control", "")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("range_header, status, body, content_range", [
+    ("bytes=2-5", 206, b"2345", "bytes 2-5/10"),
+    ("bytes=7-", 206, b"789", "bytes 7-9/10"),
+    ("bytes=-3", 206, b"789", "bytes 7-9/10"),
+    ("bytes=8-100", 206, b"89", "bytes 8-9/10"),
+    ("bytes=10-", 416, b"", "bytes */10"),
+    ("bytes=0-1,4-5", 200, b"0123456789", None),  # Multi-range falls back to the full body
+])
+async def test_range_requests(uploads_client, range_header, status, body, content_range):
+    response = await uploads_client.get(f"/{NAME}", headers={"Range": range_header})
+    assert response.status_code == status
+    assert response.content == body
+    assert response.headers.get("Content-Range") == content_range
+
+
+@pytest.mark.asyncio
+async def test_if_range_with_a_stale_etag_returns_the_full_body(uploads_client):
+    response = await uploads_client.get(f"/{NAME}", headers={"Range": "bytes=0-1", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+
+
+def object_keys(s3) -> list:
+    return [o["Key"] for o in s3.client.list_objects_v2(Bucket=BUCKET).get("Contents", [])]
+
+
+@pytest.mark.asyncio
+async def test_writer_saves_under_the_content_addressed_key(s3_storage):
+    writer = s3_storage.writer()
+    await writer.write(b"\x89PNG")
+    await writer.write(b" image bytes")
+    await writer.commit(NAME, "image/png")
+
+    stored = s3_storage.client.get_object(Bucket=BUCKET, Key=s3_storage.key(NAME))
+    assert stored["Body"].read() == b"\x89PNG image bytes"
+    assert stored["ContentType"] == "image/png"
+    assert stored["CacheControl"] == storage.IMMUTABLE_CACHE_CONTROL
+    # The temporary multipart object is deleted once copied
+    assert object_keys(s3_storage) == [s3_storage.key(NAME)]
+    assert await s3_storage.exists(NAME)
+    assert not await s3_storage.exists("missing.png")
+
+
+@pytest.mark.asyncio
+async def test_committing_an_existing_name_keeps_the_stored_object(s3_storage):
+    for body in (b"first", b"second"):
+        writer = s3_storage.writer()
+        await writer.write(body)
+        await writer.commit(NAME, "image/png")
+
+    assert s3_storage.client.get_object(Bucket=BUCKET, Key=s3_storage.key(NAME))["Body"].read() == b"first"
+    assert object_keys(s3_storage) == [s3_storage.key(NAME)]
+
+
+@pytest.mark.asyncio
+async def test_abort_deletes_the_multipart_upload(s3_storage, monkeypatch):
+    monkeypatch.setattr(storage, "S3_PART_BYTES", 4)  # Force a part upload before the abort
+    writer = s3_storage.writer()
+    await writer.write(b"partial upload")
+
+    assert s3_storage.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    await writer.abort()
+
+    assert not s3_storage.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    assert object_keys(s3_storage) == []
+
+
+@pytest.mark.asyncio
+async def test_put_file_and_local_copy_round_trip(s3_storage, tmp_path):
+    source = tmp_path / "variant.webp"
+    source.write_bytes(b"webp bytes")
+
+    await s3_storage.put_file(source, NAME, "image/webp")
+
+    async with s3_storage.local_copy(NAME) as path:
+        assert path.read_bytes() == b"webp bytes"
+        copy_dir = path.parent
+    assert not Path(copy_dir).exists()
+
+
+@pytest.mark.asyncio
+async def test_uploads_mount_redirects_to_a_presigned_url(s3_storage):
+    url = s3_storage.presigned_url(NAME)
+    assert s3_storage.key(NAME) in url
+    assert "Signature=" in url
+
+    async with httpx.AsyncClient(app=s3_storage.asgi_app(), base_url="http://test") as client:
+        response = await client.get(f"/{NAME}")
+        assert response.status_code == 307
+        assert response.headers["Location"].split("?")[0] == url.split("?")[0]
+
+        # Only plain upload names are signed, never other keys in the bucket
+        assert (await client.get("/tmp/upload.png")).status_code == 404
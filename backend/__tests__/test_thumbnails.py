@@ -0,0 +1,67 @@
+"""
+Tests for avatar thumbnail and WebP variant rendering
+"""
+
+import pytest
+from bson import ObjectId
+
+import storage
+import thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "UPLOAD_DIRECTORY", tmp_path)
+    yield tmp_path
+    thumbnails.shutdown()
+
+
+def test_variants_fit_each_size_and_keep_transparency(tmp_path):
+    Image.new("RGB", (800, 400), "red").save(tmp_path / "photo.jpg")
+    Image.new("RGBA", (100, 300), (0, 0, 0, 0)).save(tmp_path / "logo.png")
+
+    photo = thumbnails.render_variants(str(tmp_path / "photo.jpg"), str(tmp_path), [64, 256], 80)
+    assert photo["64"] == {"url": "photo_64.jpg", "webp_url": "photo_64.webp"}
+    assert photo["original"] == {"url": "photo.jpg", "webp_url": "photo.webp"}
+    with Image.open(tmp_path / "photo_256.jpg") as thumb:
+        assert thumb.size == (256, 128)
+    with Image.open(tmp_path / "photo_64.webp") as thumb:
+        assert thumb.format == "WEBP" and thumb.size == (64, 32)
+
+    # Transparent sources fall back to PNG instead of JPEG; small images are never upscaled
+    logo = thumbnails.render_variants(str(tmp_path / "logo.png"), str(tmp_path), [512], 80)
+    assert logo["512"]["url"] == "logo_512.png"
+    with Image.open(tmp_path / "logo_512.png") as thumb:
+        assert thumb.mode == "RGBA" and thumb.size == (100, 300)
+
+
+@pytest.mark.asyncio
+async def test_variants_are_stored_and_recorded_on_the_user(test_db, upload_dir, monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_SIZES", [64])
+    Image.new("RGB", (200, 200), "blue").save(upload_dir / "avatar.jpg")
+    url = storage.upload_url("avatar.jpg")
+    user_id = ObjectId()
+    await test_db["users"].insert_one({"_id": user_id, "profile_picture_url": url})
+
+    await thumbnails.generate_profile_variants(str(user_id), "avatar.jpg", url)
+
+    user = await test_db["users"].find_one({"_id": user_id})
+    assert user["profile_picture_variants"]["64"] == {
+        "url": storage.upload_url("avatar_64.jpg"), "webp_url": storage.upload_url("avatar_64.webp")
+    }
+    assert {"avatar_64.jpg", "avatar_64.webp", "avatar.webp"} <= {p.name for p in upload_dir.iterdir()}
+
+
+@pytest.mark.asyncio
+async def test_variants_of_a_replaced_picture_are_not_recorded(test_db, upload_dir, monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_SIZES", [64])
+    Image.new("RGB", (200, 200), "blue").save(upload_dir / "old.jpg")
+    user_id = ObjectId()
+    # The user uploaded another picture while the old one was rendering
+    await test_db["users"].insert_one({"_id": user_id, "profile_picture_url": storage.upload_url("new.jpg")})
+
+    await thumbnails.generate_profile_variants(str(user_id), "old.jpg", storage.upload_url("old.jpg"))
+
+    assert "profile_picture_variants" not in await test_db["users"].find_one({"_id": user_id})
@@ -0,0 +1,87 @@
+"""
+Tests for streaming image uploads and the upload body cap
+"""
+
+import hashlib
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.responses import PlainTextResponse
+
+import storage
+import uploads
+from uploads import UploadSizeLimitMiddleware
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" * 50
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "UPLOAD_DIRECTORY", tmp_path)
+    # Small chunks so every upload streams through several reads
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_BYTES", 64)
+    return tmp_path
+
+
+def upload(data: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="avatar.png", headers={"content-type": content_type})
+
+
+@pytest.mark.asyncio
+async def test_image_is_stored_under_its_content_hash(upload_dir):
+    name = await uploads.save_image_upload(upload(PNG))
+
+    assert name == f"{hashlib.sha256(PNG).hexdigest()[:storage.CONTENT_HASH_LENGTH]}.png"
+    assert (upload_dir / name).read_bytes() == PNG
+    # Identical content maps to the same object; no temp files are left behind
+    assert await uploads.save_image_upload(upload(PNG)) == name
+    assert [p.name for p in upload_dir.iterdir()] == [name]
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_rejected_while_streaming(upload_dir, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 200)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await uploads.save_image_upload(upload(PNG))
+    assert exc_info.value.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_file_type_comes_from_the_content_not_the_client(upload_dir):
+    with pytest.raises(HTTPException) as exc_info:
+        await uploads.save_image_upload(upload(b"<script>alert(1)</script>", content_type="image/png"))
+    assert exc_info.value.status_code == 400
+
+    gif = b"GIF89a" + b"\x00" * 20
+    assert (await uploads.save_image_upload(upload(gif, content_type="text/plain"))).endswith(".gif")
+
+
+async def drain_app(scope, receive, send):
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    await PlainTextResponse(str(len(body)))(scope, receive, send)
+
+
+@pytest.mark.asyncio
+async def test_middleware_caps_the_upload_body():
+    app = UploadSizeLimitMiddleware(drain_app, paths={"/upload"}, max_bytes=100)
+
+    async def chunks():
+        for _ in range(5):
+            yield b"x" * 30
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.post("/upload", content=b"x" * 100)).text == "100"
+        # Declared too large: rejected before the body is read
+        assert (await client.post("/upload", content=b"x" * 101)).status_code == 413
+        # Streamed without Content-Length: rejected once the running total passes the cap
+        assert (await client.post("/upload", content=chunks())).status_code == 413
+        # Other routes are not capped
+        assert (await client.post("/other", content=b"x" * 1000)).text == "1000"
@@ -0,0 +1,154 @@
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from pymongo import UpdateOne
+from database import db
+from auth import get_current_user
+from constants import USER_TYPE_ADMIN
+import models
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Time-bucketed counters: one document per (metric, granularity, bucket start), bumped with $inc
+# as writes happen, so a series query reads at most one document per bucket.
+ROLLUPS_COLLECTION = "analytics_rollups"
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+MAX_SERIES_POINTS = 2000
+
+# Metric -> how to recompute it from the source collection (used by rebuild_rollups)
+METRICS: Dict[str, Dict[str, Any]] = {
+    "new_players": {"collection": "users", "match": {"user_type": "player"}, "time": "$created_at", "value": 1},
+    "new_orgs": {"collection": "users", "match": {"user_type": "org"}, "time": "$created_at", "value": 1},
+    "gigs_created": {"collection": "gigs", "match": {}, "time": "$created_at", "value": 1},
+    "gigs_completed": {
+        "collection": "gigs", "match": {"status": "completed"},
+        "time": {"$ifNull": ["$completed_at", "$updated_at"]}, "value": 1
+    },
+    "applications": {"collection": "applications", "match": {}, "time": "$created_at", "value": 1},
+    # Gross merchandise value: the player-side leg of every processed gig payment
+    "gmv": {
+        "collection": "wallet_transactions", "match": {"transaction_type": "payment", "amount": {"$gt": 0}},
+        "time": "$created_at", "value": "$amount"
+    },
+    "endorsements": {"collection": "endorsements", "match": {}, "time": "$created_at", "value": 1},
+}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    at = at.astimezone(timezone.utc) if at.tzinfo else at.replace(tzinfo=timezone.utc)
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def ensure_indexes():
+    await db[ROLLUPS_COLLECTION].create_index([("metric", 1), ("granularity", 1), ("bucket", 1)], unique=True)
+
+
+async def record(metric: str, value: float = 1, at: Optional[datetime] = None):
+    """Add a value to every granularity's bucket for a metric. Never fails the write itself."""
+    at = at or datetime.now(timezone.utc)
+    try:
+        await db[ROLLUPS_COLLECTION].bulk_write([
+            UpdateOne(
+                {"metric": metric, "granularity": granularity, "bucket": bucket_start(at, granularity)},
+                {"$inc": {"value": value}},
+                upsert=True
+            )
+            for granularity in GRANULARITIES
+        ], ordered=False)
+    except Exception as e:
+        logger.warning("analytics.record_failed", extra={"metric": metric, "error": type(e).__name__})
+
+
+def _bucket_expression(granularity: str) -> Dict[str, Any]:
+    # $dateFromParts rather than $dateTrunc (MongoDB 5.0+), so rebuilds run on MongoDB 4.x; dates are UTC
+    parts = {"year": {"$year": "$_at"}, "month": {"$month": "$_at"}, "day": {"$dayOfMonth": "$_at"}}
+    if granularity == "hour":
+        parts["hour"] = {"$hour": "$_at"}
+    return {"$dateFromParts": parts}
+
+
+async def rebuild_rollups(since: Optional[datetime] = None, metrics: Optional[List[str]] = None):
+    """Recompute buckets from the source collections with $merge, optionally only from `since` on.
+
+    Used to backfill history and to repair drift. Every bucket from `since` (rounded down to the
+    bucket start) onwards is cleared first, so buckets whose source rows are gone drop to zero
+    instead of keeping their incremental counts.
+    """
+    for metric in metrics or list(METRICS):
+        source = METRICS[metric]
+        for granularity in GRANULARITIES:
+            buckets: Dict[str, Any] = {"metric": metric, "granularity": granularity}
+            # Rows without a real timestamp cannot be bucketed (and would make $year fail)
+            at_filter: Dict[str, Any] = {"$type": "date"}
+            if since:
+                start = bucket_start(since, granularity)
+                buckets["bucket"] = {"$gte": start}
+                at_filter["$gte"] = start
+            pipeline: List[Dict[str, Any]] = [
+                {"$match": source["match"]},
+                {"$set": {"_at": source["time"]}},
+                {"$match": {"_at": at_filter}},
+                {"$group": {"_id": _bucket_expression(granularity), "value": {"$sum": source["value"]}}},
+                {"$project": {"_id": 0, "metric": metric, "granularity": granularity, "bucket": "$_id", "value": 1}},
+                {"$merge": {
+                    "into": ROLLUPS_COLLECTION,
+                    "on": ["metric", "granularity", "bucket"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }}
+            ]
+            await db[ROLLUPS_COLLECTION].delete_many(buckets)
+            await db[source["collection"]].aggregate(pipeline).to_list(length=None)
+
+
+# ADMIN: Time series for one metric, served from the rollups
+@router.get("/admin/analytics")
+async def get_analytics(
+    metric: str = Query(...),
+    from_: datetime = Query(..., alias="from"),
+    to: datetime = Query(...),
+    granularity: str = Query("day"),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user["user_type"] != USER_TYPE_ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view analytics.")
+    if metric not in METRICS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown metric: {metric}")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid granularity: {granularity}")
+
+    start, end = bucket_start(from_, granularity), bucket_start(to, granularity)
+    step = GRANULARITIES[granularity]
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must be before 'to'.")
+    if (end - start) / step + 1 > MAX_SERIES_POINTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Range exceeds {MAX_SERIES_POINTS} {granularity} buckets.")
+
+    values = {
+        bucket_start(row["bucket"], granularity): row["value"]
+        async for row in db[ROLLUPS_COLLECTION].find(
+            {"metric": metric, "granularity": granularity, "bucket": {"$gte": start, "$lte": end}},
+            {"_id": 0, "bucket": 1, "value": 1}
+        )
+    }
+
+    # Zero-fill so clients can chart the series directly
+    series, bucket = [], start
+    while bucket <= end:
+        series.append({"bucket": bucket.isoformat(), "value": values.get(bucket, 0)})
+        bucket += step
+
+    return {
+        "metric": metric,
+        "granularity": granularity,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total": sum(point["value"] for point in series),
+        "series": series
+    }
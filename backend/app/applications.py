@@ -3,6 +3,9 @@ from database import db
 from schemas import ApplicationCreate
 import models # Import models module
 from auth import get_current_user # Import get_current_user from auth
+from pubsub import broker, user_channel
+from platform_stats import platform_stats
+import analytics
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime, timezone # Import timezone
@@ -45,6 +48,8 @@ async def apply_to_gig(application: ApplicationCreate, current_user: models.User
     app_dict["updated_at"] = datetime.now(timezone.utc)
 
     new_app = await db["applications"].insert_one(app_dict)
+    await platform_stats.increment(applications=1)
+    await analytics.record("applications")
     created_app = await db["applications"].find_one({"_id": new_app.inserted_id})
     return application_serializer(created_app)
 
@@ -178,6 +183,15 @@ async def update_application(application_id: str, update: dict, current_user: mo
             {"_id": application["gig_id"]}, 
             {"$set": {"status": "accepted", "updated_at": datetime.now(timezone.utc)}}
         )
+
+    # Notify the applicant in real time when the org changes the application status
+    if "status" in update and update["status"] != application.get("status"):
+        await broker.publish(user_channel(application["player_id"]), {
+            "type": "application_status",
+            "application_id": str(app_object_id),
+            "gig_id": str(application["gig_id"]),
+            "status": update["status"]
+        })
     
     return models.application_helper(updated_app)
 
@@ -257,6 +271,7 @@ async def delete_application_by_id(application_id: str, current_user: models.Use
     delete_result = await db["applications"].delete_one({"_id": app_object_id})
     if delete_result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found or already deleted.")
+    await platform_stats.increment(applications=-1)
     return
 
 # PLAYER: View own applications with gig info (existing endpoint, just ensure correct helpers)
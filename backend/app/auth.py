@@ -4,43 +4,118 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
 import os
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
+from typing import Optional
 import models # Import models to access User model
 from bson import ObjectId
 from database import db
+from constants import USER_TYPE_ADMIN
+from token_revocation import revocation_list
 
 router = APIRouter(prefix="/auth", tags=["auth"])  # Create router with /auth prefix
+logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing is tunable per deployment. The first scheme hashes new passwords; any others
+# are only verified and get upgraded on the next successful login, as do hashes whose cost
+# differs from PASSWORD_HASH_ROUNDS.
+PASSWORD_HASH_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt").split(",") if s.strip()]
+PASSWORD_HASH_ROUNDS = os.getenv("PASSWORD_HASH_ROUNDS")  # bcrypt default is 12 (log2 cost)
+
+def build_password_context(schemes=None, rounds=None) -> CryptContext:
+    schemes = schemes or PASSWORD_HASH_SCHEMES
+    settings = {}
+    if rounds is not None:
+        settings[f"{schemes[0]}__rounds"] = int(rounds)
+        settings[f"{schemes[0]}__min_rounds"] = int(rounds)
+        settings[f"{schemes[0]}__max_rounds"] = int(rounds)
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+pwd_context = build_password_context(rounds=PASSWORD_HASH_ROUNDS)
 # It's recommended to load SECRET_KEY from environment variables for security
 SECRET_KEY = os.getenv("SECRET_KEY", "SkillLink-super-secret-key-replace-me") # Use os.getenv
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User: # Type hint return as models.User
+# Bounded LRU of verified token -> user claims so repeat requests skip jwt.decode
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+
+class TokenCache:
+    def __init__(self, max_size: int = AUTH_TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[token]
+            raise ExpiredSignatureError("Signature has expired.")
+        self._entries.move_to_end(token)
+        return claims
+
+    def put(self, token: str, claims: dict, expires_at):
+        if self.max_size <= 0:
+            return
+        self._entries[token] = (claims, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+token_cache = TokenCache()
+
+def decode_access_token(token: str) -> dict:
+    payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    user_id: str = payload.get("id")
+    user_email: str = payload.get("email")
+    user_type: str = payload.get("user_type")
+
+    if user_id is None or user_email is None or user_type is None or payload.get("type") == "refresh":
+        logger.warning("auth.token_rejected", extra={"reason": "missing_claims"})
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload.")
+
+    claims = {
+        "id": user_id,           # Store as string for direct access if needed
+        "email": user_email,
+        "user_type": user_type,
+        "username": payload.get("username", "Unknown"), # Get username from payload if available
+        "jti": payload.get("jti"),
+        "iat": payload.get("iat"),
+        "exp": payload.get("exp")
+    }
+    token_cache.put(token, claims, payload.get("exp"))
+    return claims
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User: # Type hint return as models.User
     try:
-        print("Received token: ", token)
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("id")
-        user_email: str = payload.get("email")
-        user_type: str = payload.get("user_type")
-
-        if user_id is None or user_email is None or user_type is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload.")
-        
+        claims = token_cache.get(token)
+        if claims is None:
+            claims = decode_access_token(token)
+
+        # In-memory Bloom filter check; MongoDB is only consulted on a filter hit
+        if await revocation_list.is_revoked(claims):
+            logger.info("auth.token_rejected", extra={"reason": "revoked"})
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked.")
+
         # Return a dictionary that matches the structure User model expects (or directly create User model instance)
         # We'll ensure it has '_id' for database queries, and 'id' as string for consistency.
-        return {
-            "_id": ObjectId(user_id), # Store as ObjectId for DB queries
-            "id": user_id,           # Store as string for direct access if needed
-            "email": user_email,
-            "user_type": user_type,
-            "username": payload.get("username", "Unknown") # Get username from payload if available
-        }
+        # A fresh dict per request so handlers cannot mutate the cached claims.
+        return {"_id": ObjectId(claims["id"]), **claims} # Store _id as ObjectId for DB queries
 
     except ExpiredSignatureError:
+        logger.info("auth.token_rejected", extra={"reason": "expired"})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired.")
     except JWTError as e:
-        print("Token decode error: ", e)
+        logger.info("auth.token_rejected", extra={"reason": "invalid", "error": type(e).__name__})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token.")
 
 def hash_password(password: str):
@@ -49,12 +124,90 @@ def hash_password(password: str):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(days=1)):
+# bcrypt takes ~100-250 ms of CPU per call, so async handlers hand it to a dedicated pool
+# (bcrypt releases the GIL) instead of stalling the event loop. Work beyond the queue limit
+# is shed with a fast 429 rather than piling up behind a login storm.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", PASSWORD_HASH_WORKERS * 8))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_pending = 0  # Only touched from the event loop thread
+
+async def _run_password_hashing(fn, *args):
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_QUEUE_LIMIT:
+        logger.warning("auth.password_hash_saturated", extra={"pending": _hash_pending})
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is busy, please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+async def hash_password_async(password: str):
+    return await _run_password_hashing(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """Verify, and if the hash's scheme or cost is outdated (needs_update) also return a fresh hash."""
+    return await _run_password_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+# Access tokens are short-lived so revocations take effect quickly; the frontend renews them
+# through /auth/refresh with the rotating refresh token
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15)))
+REFRESH_TOKEN_LIFETIME = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14)))
+
+def create_access_token(data: dict, expires_delta: timedelta = ACCESS_TOKEN_LIFETIME):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex, "type": "access"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
 
+async def create_refresh_token(user_id: str, family_id: Optional[str] = None) -> str:
+    # Every refresh token of one login session shares a family, so reuse of a rotated token
+    # can revoke the whole chain
+    jti = uuid.uuid4().hex
+    expire = datetime.now(timezone.utc) + REFRESH_TOKEN_LIFETIME
+    await db["refresh_tokens"].insert_one({
+        "jti": jti,
+        "user_id": user_id,
+        "family_id": family_id or jti,
+        "used": False,
+        "expires_at": expire
+    })
+    return jwt.encode({"id": user_id, "jti": jti, "exp": expire, "type": "refresh"}, SECRET_KEY, algorithm="HS256")
+
+async def ensure_indexes():
+    await db["refresh_tokens"].create_index("jti", unique=True)
+    await db["refresh_tokens"].create_index("family_id")
+    await db["refresh_tokens"].create_index("user_id")
+    await db["refresh_tokens"].create_index("expires_at", expireAfterSeconds=0)
+    await revocation_list.ensure_indexes()
+
+async def _issue_tokens(user: dict, family_id: Optional[str] = None) -> dict:
+    user_id = str(user["_id"])
+    access_token = create_access_token(
+        data={
+            "id": user_id,
+            "email": user["email"],
+            "user_type": user["user_type"],
+            "username": user.get("username", "Unknown")
+        }
+    )
+    refresh_token = await create_refresh_token(user_id, family_id)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(ACCESS_TOKEN_LIFETIME.total_seconds())
+    }
+
 # Verify org/player functions already use get_current_user
 def verify_org(current_user: models.User = Depends(get_current_user)): # Use models.User
     if current_user.user_type != "org": # Access via .user_type if it's a Pydantic model
@@ -71,18 +224,80 @@ from fastapi import Form
 @router.post("/login")
 async def login(email: str = Form(...), password: str = Form(...)):
     user = await db.users.find_one({"email": email.lower()})
-    if not user or not verify_password(password, user["hashed_password"]):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
-    
-    access_token = create_access_token(
-        data={
-            "id": str(user["_id"]),
-            "email": user["email"],
-            "user_type": user["user_type"],
-            "username": user.get("username", "Unknown")
-        }
+
+    valid, new_hash = await verify_and_update_password_async(password, user["hashed_password"])
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    if new_hash:
+        # Transparent rehash with the current scheme/cost; guarded so a concurrent login can't clobber it
+        await db.users.update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+
+    return await _issue_tokens(user)
+
+@router.post("/refresh")
+async def refresh_tokens(refresh_token: str = Form(...)):
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=["HS256"])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+    # Rotation: each refresh token can be exchanged exactly once
+    record = await db["refresh_tokens"].find_one_and_update(
+        {"jti": payload["jti"], "used": False},
+        {"$set": {"used": True}}
+    )
+    if not record:
+        reused = await db["refresh_tokens"].find_one({"jti": payload["jti"]}, {"family_id": 1})
+        if reused:
+            # A rotated token came back: assume it was stolen and end the whole session
+            logger.warning("auth.refresh_token_reused", extra={"user_id": payload.get("id")})
+            await db["refresh_tokens"].delete_many({"family_id": reused["family_id"]})
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+    user = await db.users.find_one(
+        {"_id": ObjectId(record["user_id"])},
+        {"email": 1, "user_type": 1, "username": 1}
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+    return await _issue_tokens(user, record["family_id"])
+
+@router.post("/logout")
+async def logout(refresh_token: Optional[str] = Form(None), current_user: models.User = Depends(get_current_user)):
+    if current_user.get("jti"):
+        await revocation_list.revoke_token(current_user["jti"], current_user.get("exp"))
+    if refresh_token:
+        try:
+            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=["HS256"])
+        except JWTError:
+            payload = {}
+        record = await db["refresh_tokens"].find_one({"jti": payload.get("jti"), "user_id": current_user["id"]}, {"family_id": 1})
+        if record:
+            await db["refresh_tokens"].delete_many({"family_id": record["family_id"]})
+    return {"message": "Logged out successfully."}
+
+# ADMIN: Revoke every outstanding token for a user (e.g. when banning them)
+@router.post("/revoke-user/{user_id}")
+async def revoke_user_tokens(user_id: str, current_user: models.User = Depends(get_current_user)):
+    if current_user["user_type"] != USER_TYPE_ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can revoke user tokens.")
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid User ID format.")
+
+    await revocation_list.revoke_user(user_id, ACCESS_TOKEN_LIFETIME)
+    await db["refresh_tokens"].delete_many({"user_id": user_id})
+    return {"message": "User tokens revoked."}
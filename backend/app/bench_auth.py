@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request JWT verification overhead, with and without the token cache.
+
+Run from backend/app:  python bench_auth.py [--requests 100000] [--users 1000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from bson import ObjectId
+from auth import create_access_token, get_current_user, token_cache
+
+async def run(tokens, requests: int) -> float:
+    """Return seconds spent verifying `requests` randomly chosen tokens"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await get_current_user(random.choice(tokens))
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000, help="distinct tokens in the request mix")
+    args = parser.parse_args()
+
+    tokens = [
+        create_access_token({"id": str(ObjectId()), "email": f"user{i}@example.com", "user_type": "player", "username": f"user{i}"})
+        for i in range(args.users)
+    ]
+
+    print(f"🔐 Verifying {args.requests} requests across {args.users} tokens")
+
+    original_size = token_cache.max_size
+    token_cache.max_size = 0
+    uncached = asyncio.run(run(tokens, args.requests))
+    token_cache.max_size = original_size
+    token_cache.clear()
+    cached = asyncio.run(run(tokens, args.requests))
+
+    for label, seconds in (("jwt.decode every request", uncached), ("token cache", cached)):
+        per_request_us = seconds / args.requests * 1e6
+        print(f"   {label:<26} {per_request_us:8.2f} µs/request  ~{args.requests / seconds:,.0f} req/s per core")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark password hashing throughput to size login capacity.
+
+Run from backend/app:  python bench_password_hash.py [--rounds 10 11 12 13] [--seconds 3]
+Reports hashes per second on one core for the configured scheme (PASSWORD_HASH_SCHEMES)
+and the resulting login capacity of the PASSWORD_HASH_WORKERS pool.
+"""
+
+import argparse
+import os
+import time
+from auth import build_password_context, PASSWORD_HASH_SCHEMES, PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS
+
+def hashes_per_second(context, seconds: float) -> float:
+    """Hash back to back on the calling thread (one core) for roughly `seconds`"""
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        context.hash("benchmark-password")
+        count += 1
+    return count / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, nargs="*", help="cost settings to compare (default: configured)")
+    parser.add_argument("--seconds", type=float, default=3, help="measurement time per setting")
+    args = parser.parse_args()
+
+    scheme = PASSWORD_HASH_SCHEMES[0]
+    settings = args.rounds or [PASSWORD_HASH_ROUNDS]
+    print(f"🔑 {scheme} on {os.cpu_count()} CPUs, {PASSWORD_HASH_WORKERS} hashing workers")
+
+    for rounds in settings:
+        context = build_password_context(rounds=rounds)
+        per_core = hashes_per_second(context, args.seconds)
+        label = f"rounds={rounds}" if rounds is not None else "rounds=default"
+        print(
+            f"   {label:<16} {per_core:8.1f} hashes/s/core  {1000 / per_core:7.1f} ms/hash  "
+            f"~{per_core * PASSWORD_HASH_WORKERS:8.1f} logins/s per worker process"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import math
+import os
+
+
+def available_cpus() -> list:
+    """CPUs this process may run on: the affinity mask, narrowed by a cgroup CPU quota if set."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    try:
+        # cgroup v2 "max 100000" (unlimited) or "200000 100000" (2 CPUs), as set by container limits
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = cpus[:max(1, math.ceil(int(quota) / int(period)))]
+    except (OSError, ValueError):
+        pass
+    return cpus
@@ -7,6 +7,15 @@ from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime, timezone
 from typing import Optional
+import logging
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from reputation import apply_endorsement
+from profile_cache import profile_cache
+from platform_stats import platform_stats
+import analytics
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -24,14 +33,71 @@ async def endorse_user(endorsement: EndorsementCreate, current_user: models.User
     except InvalidId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Endorsed User ID format.")
 
-    endorse_dict = endorsement.model_dump()
-    endorse_dict["endorsed_id"] = endorsed_object_id
-    endorse_dict["endorsed_by"] = ObjectId(current_user["id"])
-    endorse_dict["created_at"] = datetime.now(timezone.utc)
-    
-    new_endorse = await db["endorsements"].insert_one(endorse_dict)
-    created_endorsement = await db["endorsements"].find_one({"_id": new_endorse.inserted_id})
-    return models.endorsement_helper(created_endorsement)
+    # One endorsement per (player, org): re-endorsing replaces the rating and comment in place
+    pair = {"endorsed_id": endorsed_object_id, "endorsed_by": ObjectId(current_user["id"])}
+    now = datetime.now(timezone.utc)
+    update = {
+        "$set": {"rating": endorsement.rating, "comment": endorsement.comment, "updated_at": now},
+        "$setOnInsert": {"created_at": now}
+    }
+    try:
+        previous = await db["endorsements"].find_one_and_update(pair, update, upsert=True, return_document=ReturnDocument.BEFORE)
+    except DuplicateKeyError:
+        # A concurrent first endorsement from the same org won the insert; apply ours on top of it
+        previous = await db["endorsements"].find_one_and_update(pair, update, return_document=ReturnDocument.BEFORE)
+
+    if previous is None:
+        await apply_endorsement(endorsed_object_id, endorsement.rating)
+        await platform_stats.increment(endorsements=1)
+        await analytics.record("endorsements")
+    elif previous["rating"] != endorsement.rating:
+        await apply_endorsement(endorsed_object_id, endorsement.rating, previous_rating=previous["rating"])
+    await profile_cache.invalidate(endorsement.endorsed_id)
+
+    endorsement_doc = await db["endorsements"].find_one(pair)
+    return models.endorsement_helper(endorsement_doc)
+
+# Filtered totals are counted exactly up to this many matches, then reported as a lower bound
+ENDORSEMENT_COUNT_CAP = 1000
+SORT_FIELDS = {"created_at", "rating"}
+
+
+async def ensure_indexes():
+    # One index per sort order; _id breaks ties so keyset cursors are unambiguous
+    await db["endorsements"].create_index([("endorsed_id", 1), ("created_at", -1), ("_id", -1)])
+    await db["endorsements"].create_index([("endorsed_id", 1), ("rating", -1), ("_id", -1)])
+    try:
+        await db["endorsements"].create_index([("endorsed_id", 1), ("endorsed_by", 1)], unique=True)
+    except OperationFailure as e:
+        # Existing duplicates block the index; migrate_endorsement_pairs.py merges them
+        logger.warning("endorsements.unique_pair_index_failed", extra={"error": str(e)})
+
+
+async def dedupe_endorsement_pairs() -> int:
+    """Keep only the latest endorsement per (endorsed_id, endorsed_by). Returns the number removed."""
+    removed = 0
+    async for group in db["endorsements"].aggregate([
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$group": {"_id": {"endorsed_id": "$endorsed_id", "endorsed_by": "$endorsed_by"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True):
+        result = await db["endorsements"].delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    return removed
+
+
+def encode_cursor(endorsement, sort_by: str) -> str:
+    value = endorsement.get(sort_by)
+    return f"{value.isoformat() if isinstance(value, datetime) else value}_{endorsement['_id']}"
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    try:
+        value, endorsement_id = cursor.rsplit("_", 1)
+        return (datetime.fromisoformat(value) if sort_by == "created_at" else int(value)), ObjectId(endorsement_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
 
 # ANYONE: View endorsements of a user (usually player)
 @router.get("/endorsements/{user_id}")
@@ -39,6 +105,7 @@ async def view_endorsements(
     user_id: str,
     page: int = 1,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     endorsed_by: Optional[str] = Query(None),
     min_rating: Optional[int] = Query(None),
     max_rating: Optional[int] = Query(None),
@@ -78,22 +145,43 @@ async def view_endorsements(
         except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid created_after date format.")
 
-    allowed_sort_fields = {"created_at", "rating"}
-    if sort_by not in allowed_sort_fields:
+    if sort_by not in SORT_FIELDS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid sort field: {sort_by}")
 
     sort_order = -1 if order.lower() == "desc" else 1
+    filtered = len(query_filter) > 1
+
+    # Totals: the materialized per-user count when unfiltered, a capped count otherwise
+    if filtered:
+        total = await db["endorsements"].count_documents(query_filter, limit=ENDORSEMENT_COUNT_CAP)
+        total_exact = total < ENDORSEMENT_COUNT_CAP
+    else:
+        user = await db["users"].find_one({"_id": user_object_id}, {"endorsement_count": 1})
+        total = (user or {}).get("endorsement_count", 0)
+        total_exact = True
+
+    page_filter = dict(query_filter)
+    if cursor:
+        # Keyset: continue strictly after the last (sort value, _id) already returned
+        value, last_id = decode_cursor(cursor, sort_by)
+        op = "$lt" if sort_order == -1 else "$gt"
+        page_filter["$or"] = [
+            {sort_by: {op: value}},
+            {sort_by: value, "_id": {op: last_id}}
+        ]
+
+    find = db["endorsements"].find(page_filter).sort([(sort_by, sort_order), ("_id", sort_order)])
+    if not cursor and page > 1:
+        find = find.skip((page - 1) * limit)  # Offset paging kept for existing clients; prefer cursor
+    endorsements_list = await find.limit(limit).to_list(length=limit)
 
-    total = await db["endorsements"].count_documents(query_filter)
-    cursor = db["endorsements"].find(query_filter).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
-
-    endorsements_list = await cursor.to_list(length=limit)
-    
     return {
         "page": page,
         "limit": limit,
         "count": len(endorsements_list),
         "total": total,
+        "total_exact": total_exact,
+        "next_cursor": encode_cursor(endorsements_list[-1], sort_by) if len(endorsements_list) == limit else None,
         "results": [models.endorsement_helper(e) for e in endorsements_list] # Use helper for formatting
     }
 
@@ -112,5 +200,10 @@ async def delete_endorsement(endorsement_id: str, current_user: models.User = De
     if str(endorsement["endorsed_by"]) != str(current_user["id"]):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only delete your own endorsements.")
 
-    await db["endorsements"].delete_one({"_id": endorsement_object_id})
+    delete_result = await db["endorsements"].delete_one({"_id": endorsement_object_id})
+    if delete_result.deleted_count:
+        # Only the request that actually removed the endorsement takes it out of the aggregates
+        await apply_endorsement(endorsement["endorsed_id"], previous_rating=endorsement["rating"])
+        await profile_cache.invalidate(str(endorsement["endorsed_id"]))
+        await platform_stats.increment(endorsements=-1)
     return {"message": "Endorsement deleted successfully."}
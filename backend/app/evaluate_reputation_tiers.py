@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Run the reputation tier evaluator once (e.g. from cron), outside the API workers
+"""
+
+import asyncio
+import sys
+from reputation_tiers import ensure_indexes, evaluate_tiers, run_incremental
+
+async def evaluate_reputation_tiers(full: bool = False):
+    """Incremental by default; pass --full to re-evaluate every player"""
+    print("🔄 Evaluating reputation tiers...")
+
+    try:
+        await ensure_indexes()
+        result = await evaluate_tiers() if full else await run_incremental()
+        if result is None:
+            print("   ⏭️  Another worker is already running the evaluator")
+        else:
+            print(f"   ✅ Scanned {result['scanned']} players, updated {result['changed']} tiers")
+    except Exception as e:
+        print(f"❌ Error during evaluation: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(evaluate_reputation_tiers(full="--full" in sys.argv))
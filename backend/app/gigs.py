@@ -5,6 +5,8 @@ from bson import ObjectId
 from database import db
 import models # Import models module
 from auth import get_current_user
+from platform_stats import platform_stats
+import analytics
 from schemas import GigCreate, GigUpdate, GigOut # Correct: GigCreate and GigUpdate are from schemas
 
 router = APIRouter()
@@ -111,6 +113,8 @@ async def create_gig(gig: GigCreate, current_user: models.User = Depends(get_cur
     gig_dict["status"] = "active" # Default status
 
     new_gig = await db["gigs"].insert_one(gig_dict)
+    await platform_stats.increment(gigs=1)
+    await analytics.record("gigs_created")
     created_gig = await db["gigs"].find_one({"_id": new_gig.inserted_id})
     
     # Lock funds for the gig
@@ -180,6 +184,7 @@ async def delete_gig(gig_id: str, current_user: models.User = Depends(get_curren
     delete_result = await db["gigs"].delete_one({"_id": gig_object_id})
     if delete_result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gig not found or already deleted")
+    await platform_stats.increment(gigs=-1)
     return
 
 # --- COMPLETION ENDPOINTS ---
@@ -208,11 +213,15 @@ async def complete_gig(gig_id: str, current_user: models.User = Depends(get_curr
     if not accepted_application:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot complete gig without an accepted application")
 
+    completed_at = datetime.now(timezone.utc)
     update_data = {
         "status": "completed",
-        "updated_at": datetime.now(timezone.utc)
+        "completed_at": completed_at,
+        "updated_at": completed_at
     }
 
-    await db["gigs"].update_one({"_id": gig_object_id}, {"$set": update_data})
+    result = await db["gigs"].update_one({"_id": gig_object_id, "status": {"$ne": "completed"}}, {"$set": update_data})
+    if result.modified_count:
+        await analytics.record("gigs_completed", at=completed_at)
     updated_gig = await db["gigs"].find_one({"_id": gig_object_id})
     return gig_serializer(updated_gig)
\ No newline at end of file
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Load test: latency of a non-auth endpoint before and during a /auth/login storm.
+
+Start the server first, then run from backend/app:
+    python loadtest_login_storm.py [--base-url http://127.0.0.1:8000] [--logins 64] [--duration 10]
+With bcrypt off the event loop, GET / latency during the storm should stay close to the baseline,
+and logins beyond PASSWORD_HASH_QUEUE_LIMIT should come back as fast 429s.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+import httpx
+
+async def probe(client: httpx.AsyncClient, base_url: str, stop_at: float, latencies: list):
+    """Hit GET / back to back and record latency in ms"""
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        await client.get(f"{base_url}/")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def login_storm(client: httpx.AsyncClient, base_url: str, stop_at: float, statuses: Counter):
+    """Repeatedly attempt a login with a wrong password so every request runs bcrypt"""
+    while time.monotonic() < stop_at:
+        response = await client.post(
+            f"{base_url}/auth/login",
+            data={"email": "loadtest@example.com", "password": "wrong-password"}
+        )
+        statuses[response.status_code] += 1
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"   {label:<14} n={len(latencies):<6} p50={statistics.median(latencies):7.2f} ms  p95={p95:7.2f} ms  max={latencies[-1]:7.2f} ms")
+
+async def run(base_url: str, logins: int, duration: float):
+    limits = httpx.Limits(max_connections=logins + 8)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        # Make sure the login account exists so bcrypt verify actually runs
+        await client.post(f"{base_url}/register", json={
+            "username": "loadtest", "email": "loadtest@example.com", "password": "loadtest-password", "user_type": "player"
+        })
+
+        print("🚦 Measuring baseline GET / latency...")
+        baseline = []
+        await asyncio.gather(*(probe(client, base_url, time.monotonic() + duration / 2, baseline) for _ in range(4)))
+
+        print(f"🔥 Measuring GET / latency during a storm of {logins} concurrent logins...")
+        during, statuses = [], Counter()
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(
+            *(login_storm(client, base_url, stop_at, statuses) for _ in range(logins)),
+            *(probe(client, base_url, stop_at, during) for _ in range(4))
+        )
+
+    print("\n📊 Results")
+    summarize("baseline", baseline)
+    summarize("login storm", during)
+    print(f"   login responses: {dict(statuses)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login workers")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of storm")
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.logins, args.duration))
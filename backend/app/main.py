@@ -1,16 +1,70 @@
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, status
 from starlette.middleware.cors import CORSMiddleware
-from starlette.staticfiles import StaticFiles
 
 # Add the project's 'backend' directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 # Import all routers
-import users, gigs, applications, endorsements, nft, messages, wallet, auth # Import auth router
+import users, gigs, applications, endorsements, nft, messages, wallet, auth, realtime, players, analytics # Import auth router
+from pubsub import broker
+import message_search
+from message_buffer import message_buffer
+from token_revocation import revocation_list
+from profile_cache import profile_cache
+from platform_stats import platform_stats
+import reputation_tiers
+from reputation_tiers import reputation_tier_job
+from rate_limit import RateLimitMiddleware, buckets as rate_limit_buckets
+from uploads import UploadSizeLimitMiddleware
+from storage import storage
+import thumbnails
+from database import mongo
+from constants import USER_TYPE_ADMIN
+import models
 
-app = FastAPI()
+
+async def create_indexes():
+    # The MongoDB indexes each router relies on
+    await messages.ensure_indexes()
+    await message_search.ensure_indexes()
+    await auth.ensure_indexes()
+    await rate_limit_buckets.ensure_indexes()
+    await players.ensure_indexes()
+    await analytics.ensure_indexes()
+    await endorsements.ensure_indexes()
+    await reputation_tiers.ensure_indexes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Mongo client per worker, warmed up before the first request is accepted
+    await mongo.connect()
+    await create_indexes()
+    # Pub/sub fanout for real-time delivery and cross-worker invalidation, then background jobs
+    await broker.start()
+    await revocation_list.start()
+    await profile_cache.start()
+    await platform_stats.start()
+    await reputation_tier_job.start()
+    try:
+        yield
+    finally:
+        await reputation_tier_job.stop()
+        await platform_stats.stop()
+        # Flush any buffered chat messages while the broker and database are still up
+        if message_buffer:
+            await message_buffer.close()
+        await profile_cache.stop()
+        await revocation_list.stop()
+        await broker.stop()
+        thumbnails.shutdown()
+        await mongo.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS Middleware setup
 origins = [
@@ -24,17 +78,25 @@ origins = [
     "*"  # Allow all origins for development
 ]
 
+# Cap upload request bodies while they stream in
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Token-bucket rate limiting for login and write routes (added first so CORS wraps its 429s)
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Conversation list paging
 )
 
-# Mount a static directory to serve uploaded files
-# Ensure this 'uploads' directory exists inside your 'backend/app' folder
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Serve uploaded files from the configured storage backend
+# Local: content-addressed files get strong ETags, immutable Cache-Control and Range support
+# S3: requests are redirected to short-lived presigned URLs
+app.mount("/uploads", storage.asgi_app(), name="uploads")
 
 # Include all routers
 app.include_router(auth.router)  # Include auth router first
@@ -45,7 +107,16 @@ app.include_router(endorsements.router)
 app.include_router(nft.router)
 app.include_router(messages.router) # Include the messages router
 app.include_router(wallet.router) # Include the wallet router
+app.include_router(realtime.router) # WebSocket delivery of chat messages and notifications
+app.include_router(players.router) # Player directory for scouting
+app.include_router(analytics.router) # Admin time-series analytics
 
 @app.get("/")
 def root():
-    return {"message": "SkillLink Backend Running"}
\ No newline at end of file
+    return {"message": "SkillLink Backend Running"}
+
+@app.get("/admin/db/pool-stats")
+def get_db_pool_stats(current_user: models.User = Depends(auth.get_current_user)):
+    if current_user["user_type"] != USER_TYPE_ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view pool statistics.")
+    return mongo.stats()
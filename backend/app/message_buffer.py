@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from database import db
+import message_search
+
+# Group commit for chat bursts: messages submitted within one flush window are written with a
+# single insert_many plus one coalesced conversation update each. Callers are acknowledged
+# only after their batch is durable.
+MESSAGE_BUFFER_ENABLED = os.getenv("MESSAGE_BUFFER_ENABLED", "false").lower() == "true"
+MESSAGE_BUFFER_FLUSH_MS = float(os.getenv("MESSAGE_BUFFER_FLUSH_MS", 5))
+MESSAGE_BUFFER_MAX_BATCH = int(os.getenv("MESSAGE_BUFFER_MAX_BATCH", 500))
+
+# Number of characters of the latest message kept on the conversation for list previews
+LAST_MESSAGE_PREVIEW_LENGTH = 120
+
+PendingMessage = Tuple[Dict[str, Any], List[ObjectId]]
+
+
+async def write_messages(batch: List[PendingMessage]):
+    """Persist messages and fold them into their conversations' preview and unread counters."""
+    messages = [message for message, _ in batch]
+    await db["messages"].insert_many(messages, ordered=True)
+
+    updates: Dict[ObjectId, Dict[str, Any]] = {}
+    for message, participants in batch:
+        convo_update = updates.setdefault(message["conversation_id"], {"$set": {}, "$inc": {}})
+        # Messages arrive in submission order, so the last one wins the preview
+        convo_update["$set"]["updated_at"] = message["created_at"]
+        convo_update["$set"]["last_message"] = {
+            "text": message["text"][:LAST_MESSAGE_PREVIEW_LENGTH],
+            "sender_id": message["sender_id"],
+            "created_at": message["created_at"]
+        }
+        for participant in participants:
+            if participant != message["sender_id"]:
+                key = f"unread_counts.{participant}"
+                convo_update["$inc"][key] = convo_update["$inc"].get(key, 0) + 1
+
+    await db["conversations"].bulk_write(
+        [UpdateOne({"_id": convo_id}, {k: v for k, v in update.items() if v}) for convo_id, update in updates.items()],
+        ordered=False
+    )
+
+    postings = [p for message, participants in batch for p in message_search.postings_for(message, participants)]
+    if postings:
+        await db[message_search.SEARCH_COLLECTION].insert_many(postings, ordered=False)
+
+
+class MessageWriteBuffer:
+    def __init__(self, flush_window_ms: float = MESSAGE_BUFFER_FLUSH_MS, max_batch: int = MESSAGE_BUFFER_MAX_BATCH):
+        self.flush_window = flush_window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Dict[str, Any], List[ObjectId], asyncio.Future, float]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set = set()
+        self._started_at = time.monotonic()
+        self._messages_written = 0
+        self._batches_written = 0
+        self._flush_seconds_total = 0.0
+        self._ack_seconds_total = 0.0
+        self._ack_seconds_max = 0.0
+
+    async def submit(self, message: Dict[str, Any], participants: List[ObjectId]) -> Dict[str, Any]:
+        """Queue a message and wait until the batch containing it has been flushed."""
+        message.setdefault("_id", ObjectId())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, participants, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self.flush_window)
+
+        await future
+        return message
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        started = time.monotonic()
+        try:
+            await write_messages([(message, participants) for message, participants, _, _ in batch])
+        except Exception as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        self._batches_written += 1
+        self._messages_written += len(batch)
+        self._flush_seconds_total += finished - started
+        for _, _, future, submitted in batch:
+            self._ack_seconds_total += finished - submitted
+            self._ack_seconds_max = max(self._ack_seconds_max, finished - submitted)
+            if not future.done():
+                future.set_result(None)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "enabled": True,
+            "flush_window_ms": self.flush_window * 1000,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "messages_written": self._messages_written,
+            "batches_written": self._batches_written,
+            "avg_batch_size": self._messages_written / self._batches_written if self._batches_written else 0,
+            "avg_flush_ms": self._flush_seconds_total / self._batches_written * 1000 if self._batches_written else 0,
+            "avg_ack_latency_ms": self._ack_seconds_total / self._messages_written * 1000 if self._messages_written else 0,
+            "max_ack_latency_ms": self._ack_seconds_max * 1000,
+            "messages_per_second": self._messages_written / elapsed if elapsed else 0,
+        }
+
+
+message_buffer = MessageWriteBuffer() if MESSAGE_BUFFER_ENABLED else None
@@ -0,0 +1,129 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from database import db
+
+# Per-user inverted index over chat messages. Each message gets one posting per participant:
+#   {user_id, message_id, conversation_id, terms: [...]}
+# so a search only ever touches postings for conversations the user is part of.
+SEARCH_COLLECTION = "message_search"
+
+MIN_TERM_LENGTH = 2
+MAX_TERMS_PER_MESSAGE = 64
+SNIPPET_RADIUS = 40
+# Postings upserted per bulk_write by the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, de-duplicated word tokens in order of first appearance."""
+    seen = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if len(token) >= MIN_TERM_LENGTH and token not in seen:
+            seen.append(token)
+            if len(seen) == MAX_TERMS_PER_MESSAGE:
+                break
+    return seen
+
+
+async def ensure_indexes():
+    # Equality on user_id, $all on the multikey terms, then keyset pagination on message_id
+    await db[SEARCH_COLLECTION].create_index([("user_id", 1), ("terms", 1), ("message_id", -1)])
+    await db[SEARCH_COLLECTION].create_index([("message_id", 1), ("user_id", 1)], unique=True)
+
+
+def postings_for(message: Dict[str, Any], participants: List[ObjectId]) -> List[Dict[str, Any]]:
+    terms = tokenize(message.get("text", ""))
+    if not terms:
+        return []
+    return [
+        {
+            "user_id": participant,
+            "message_id": message["_id"],
+            "conversation_id": message["conversation_id"],
+            "terms": terms
+        }
+        for participant in participants
+    ]
+
+
+async def backfill_search_index() -> int:
+    """Index messages written before the search index existed. Safe to re-run."""
+    indexed = 0
+    updates: List[UpdateOne] = []
+    participants_by_convo: Dict[ObjectId, List[ObjectId]] = {}
+    async for message in db["messages"].find({}, {"text": 1, "conversation_id": 1}):
+        convo_id = message["conversation_id"]
+        if convo_id not in participants_by_convo:
+            convo = await db["conversations"].find_one({"_id": convo_id}, {"participants": 1})
+            participants_by_convo[convo_id] = convo["participants"] if convo else []
+        for posting in postings_for(message, participants_by_convo[convo_id]):
+            updates.append(UpdateOne(
+                {"message_id": posting["message_id"], "user_id": posting["user_id"]},
+                {"$set": posting},
+                upsert=True
+            ))
+            indexed += 1
+        if len(updates) >= BACKFILL_BATCH_SIZE:
+            await db[SEARCH_COLLECTION].bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await db[SEARCH_COLLECTION].bulk_write(updates, ordered=False)
+    return indexed
+
+
+def highlight(text: str, terms: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Return a snippet around the first match and the [start, end) offsets of matches in it."""
+    matches = [
+        (m.start(), m.end()) for m in _TOKEN_RE.finditer(text)
+        if m.group(0).lower() in terms
+    ]
+    if not matches:
+        return text[:2 * SNIPPET_RADIUS], []
+
+    start = max(0, matches[0][0] - SNIPPET_RADIUS)
+    end = min(len(text), matches[0][1] + SNIPPET_RADIUS)
+    snippet = text[start:end]
+    offsets = [(s - start, e - start) for s, e in matches if s >= start and e <= end]
+    return snippet, offsets
+
+
+async def search_messages(user_id: ObjectId, query: str, limit: int, cursor: Optional[ObjectId] = None) -> Dict[str, Any]:
+    terms = tokenize(query)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+
+    posting_filter: Dict[str, Any] = {"user_id": user_id, "terms": {"$all": terms}}
+    if cursor:
+        posting_filter["message_id"] = {"$lt": cursor}
+
+    postings = await db[SEARCH_COLLECTION].find(
+        posting_filter, {"message_id": 1}
+    ).sort("message_id", -1).limit(limit).to_list(length=limit)
+
+    message_ids = [p["message_id"] for p in postings]
+    messages = {
+        m["_id"]: m
+        async for m in db["messages"].find({"_id": {"$in": message_ids}})
+    }
+
+    results = []
+    for message_id in message_ids:
+        message = messages.get(message_id)
+        if not message:
+            continue
+        snippet, offsets = highlight(message.get("text", ""), terms)
+        results.append({
+            "message_id": str(message_id),
+            "conversation_id": str(message.get("conversation_id")),
+            "sender_id": str(message.get("sender_id")),
+            "created_at": message.get("created_at").isoformat() if message.get("created_at") else None,
+            "snippet": snippet,
+            "highlights": [list(o) for o in offsets]
+        })
+
+    next_cursor = str(message_ids[-1]) if len(message_ids) == limit else None
+    return {"results": results, "next_cursor": next_cursor}
@@ -1,44 +1,147 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response
 from typing import List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database import db
 import models
 from auth import get_current_user # Import get_current_user from auth
+from constants import USER_TYPE_ADMIN
+from pubsub import broker, user_channel
+import message_search
+from message_buffer import message_buffer, write_messages
 from schemas import MessageCreate, ConversationCreate, ConversationOut, MessageOut # Import new schemas
 
 router = APIRouter()
 
+# Indexes backing the conversation list and message history queries
+async def ensure_indexes():
+    await db["conversations"].create_index([("participants", 1), ("updated_at", -1), ("_id", -1)])
+    await db["messages"].create_index([("conversation_id", 1), ("created_at", 1)])
+    await db["conversations"].create_index(
+        "pair_key",
+        unique=True,
+        partialFilterExpression={"pair_key": {"$type": "string"}}
+    )
+
+# Canonical key for a direct conversation: both participant ids, sorted, so (a, b) and (b, a) match
+def conversation_pair_key(user1_id: ObjectId, user2_id: ObjectId) -> str:
+    return ":".join(sorted([str(user1_id), str(user2_id)]))
+
 # Helper to ensure a conversation exists between two participants
 async def get_or_create_conversation(user1_id: ObjectId, user2_id: ObjectId):
-    # Find existing conversation where both are participants
-    conversation = await db["conversations"].find_one({
-        "participants": {"$all": [user1_id, user2_id], "$size": 2}
-    })
-    
-    if conversation:
-        return conversation
-    
-    # If not found, create a new one
-    new_convo_data = {
-        "participants": [user1_id, user2_id],
-        "created_at": datetime.now(timezone.utc),
-        "updated_at": datetime.now(timezone.utc)
-    }
-    result = await db["conversations"].insert_one(new_convo_data)
-    created_convo = await db["conversations"].find_one({"_id": result.inserted_id})
-    return created_convo
-
-# GET all conversations for the current user
+    # Single upsert on the unique pair_key index, so concurrent callers converge on one thread
+    pair_key = conversation_pair_key(user1_id, user2_id)
+    now = datetime.now(timezone.utc)
+    try:
+        return await db["conversations"].find_one_and_update(
+            {"pair_key": pair_key},
+            {"$setOnInsert": {
+                "pair_key": pair_key,
+                "participants": [user1_id, user2_id],
+                "created_at": now,
+                "updated_at": now
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Lost the insert race to a concurrent upsert; the winner's document is now visible
+        return await db["conversations"].find_one({"pair_key": pair_key})
+
+# Backfill pair_key on conversations created before it existed. Duplicate threads for the
+# same pair are merged into the oldest one so the unique index can be built.
+async def backfill_pair_keys() -> int:
+    updated = 0
+    async for convo in db["conversations"].find({"pair_key": {"$exists": False}}).sort("created_at", 1):
+        participants = convo.get("participants", [])
+        if len(participants) != 2:
+            continue
+        pair_key = conversation_pair_key(*participants)
+        canonical = await db["conversations"].find_one({"pair_key": pair_key})
+        if canonical:
+            await db["messages"].update_many(
+                {"conversation_id": convo["_id"]},
+                {"$set": {"conversation_id": canonical["_id"]}}
+            )
+            # Search results link to the conversation, so its postings move along with the messages
+            await db[message_search.SEARCH_COLLECTION].update_many(
+                {"conversation_id": convo["_id"]},
+                {"$set": {"conversation_id": canonical["_id"]}}
+            )
+            if convo.get("updated_at") and convo["updated_at"] > canonical.get("updated_at", convo["updated_at"]):
+                await db["conversations"].update_one(
+                    {"_id": canonical["_id"]},
+                    {"$set": {"updated_at": convo["updated_at"], "last_message": convo.get("last_message")}}
+                )
+            await db["conversations"].delete_one({"_id": convo["_id"]})
+        else:
+            await db["conversations"].update_one({"_id": convo["_id"]}, {"$set": {"pair_key": pair_key}})
+        updated += 1
+    return updated
+
+def encode_conversation_cursor(convo) -> str:
+    return f"{convo['updated_at'].isoformat()}_{convo['_id']}"
+
+
+def decode_conversation_cursor(cursor: str):
+    try:
+        updated_at, convo_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(updated_at), ObjectId(convo_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+# GET all conversations for the current user, most recently active first.
+# The body stays a plain list; the cursor for the next page is sent in the X-Next-Cursor header.
 @router.get("/conversations", response_model=List[ConversationOut])
-async def get_my_conversations(current_user: models.User = Depends(get_current_user)):
+async def get_my_conversations(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    current_user: models.User = Depends(get_current_user)
+):
     user_object_id = ObjectId(current_user["id"])
-    conversations_cursor = db["conversations"].find({"participants": user_object_id})
-    conversations_list = await conversations_cursor.to_list(length=1000)
-    
-    # You might want to fetch participant names here for display in frontend
-    return [models.conversation_helper(convo) for convo in conversations_list]
+    match = {"participants": user_object_id}
+    if cursor:
+        # Keyset: continue strictly after the last (updated_at, _id) already returned
+        updated_at, convo_id = decode_conversation_cursor(cursor)
+        match["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": convo_id}}
+        ]
+    # Participant names/avatars are joined in the same round trip; last message and
+    # unread counts are denormalized onto the conversation by send_message.
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        {"$skip": 0 if cursor else offset},  # Offset kept for existing clients; prefer cursor
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "users",
+            "localField": "participants",
+            "foreignField": "_id",
+            "as": "participant_details"
+        }},
+        {"$project": {
+            "participants": 1,
+            "participant_details._id": 1,
+            "participant_details.username": 1,
+            "participant_details.profile_picture_url": 1,
+            "last_message": 1,
+            "unread_counts": 1,
+            "created_at": 1,
+            "updated_at": 1
+        }}
+    ]
+    conversations_list = await db["conversations"].aggregate(pipeline).to_list(length=limit)
+
+    if len(conversations_list) == limit:
+        response.headers["X-Next-Cursor"] = encode_conversation_cursor(conversations_list[-1])
+    return [models.conversation_helper(convo, current_user["id"]) for convo in conversations_list]
 
 # GET messages within a specific conversation
 @router.get("/conversations/{conversation_id}/messages", response_model=List[MessageOut])
@@ -91,16 +194,45 @@ async def send_message(conversation_id: str, message: MessageCreate, current_use
     message_dict["created_at"] = datetime.now(timezone.utc)
     message_dict["read_by"] = [user_object_id] # Sender has read it by default
 
-    result = await db["messages"].insert_one(message_dict)
-    created_message = await db["messages"].find_one({"_id": result.inserted_id})
+    # Insert, conversation preview/unread bump and search postings; batched when the write buffer is on
+    if message_buffer:
+        created_message = await message_buffer.submit(message_dict, conversation["participants"])
+    else:
+        await write_messages([(message_dict, conversation["participants"])])
+        created_message = message_dict
 
-    # Update conversation's updated_at timestamp
-    await db["conversations"].update_one(
-        {"_id": convo_object_id},
-        {"$set": {"updated_at": datetime.now(timezone.utc)}}
-    )
-    
-    return models.message_helper(created_message)
+    message_out = models.message_helper(created_message)
+    # Fan out to every participant's sockets, whichever worker holds them
+    for participant in conversation["participants"]:
+        await broker.publish(user_channel(participant), {"type": "message", "message": message_out})
+
+    return message_out
+
+# GET search across the current user's own chat history
+@router.get("/messages/search")
+async def search_my_messages(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: models.User = Depends(get_current_user)
+):
+    cursor_object_id = None
+    if cursor:
+        try:
+            cursor_object_id = ObjectId(cursor)
+        except InvalidId:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor format.")
+
+    return await message_search.search_messages(ObjectId(current_user["id"]), q, limit, cursor_object_id)
+
+# GET write buffer latency/throughput metrics
+@router.get("/admin/message-buffer/stats")
+async def get_message_buffer_stats(current_user: models.User = Depends(get_current_user)):
+    if current_user["user_type"] != USER_TYPE_ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view message buffer statistics.")
+    if not message_buffer:
+        return {"enabled": False}
+    return message_buffer.stats()
 
 # POST to start a new conversation (e.g., from a profile page)
 @router.post("/conversations/start", response_model=ConversationOut)
@@ -114,28 +246,12 @@ async def start_conversation(convo_create: ConversationCreate, current_user: mod
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot start a conversation with yourself.")
 
     # Check if recipient exists
-    recipient_user = await db["users"].find_one({"_id": recipient_object_id})
+    recipient_user = await db["users"].find_one({"_id": recipient_object_id}, {"_id": 1})
     if not recipient_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipient user not found.")
 
-    # Check if conversation already exists
-    existing_convo = await db["conversations"].find_one({
-        "participants": {"$all": [ObjectId(current_user["id"]), recipient_object_id], "$size": 2}
-    })
-    
-    if existing_convo:
-        return models.conversation_helper(existing_convo) # Return existing conversation
-    
-    # Create new conversation
-    new_convo_data = {
-        "participants": [ObjectId(current_user["id"]), recipient_object_id],
-        "created_at": datetime.now(timezone.utc),
-        "updated_at": datetime.now(timezone.utc)
-    }
-    result = await db["conversations"].insert_one(new_convo_data)
-    created_convo = await db["conversations"].find_one({"_id": result.inserted_id})
-    
-    return models.conversation_helper(created_convo)
+    conversation = await get_or_create_conversation(ObjectId(current_user["id"]), recipient_object_id)
+    return models.conversation_helper(conversation, current_user["id"])
 
 # PATCH to mark messages in a conversation as read
 @router.patch("/conversations/{conversation_id}/read")
@@ -158,5 +274,9 @@ async def mark_conversation_as_read(conversation_id: str, current_user: models.U
         {"conversation_id": convo_object_id, "read_by": {"$ne": user_object_id}},
         {"$addToSet": {"read_by": user_object_id}}
     )
+    await db["conversations"].update_one(
+        {"_id": convo_object_id},
+        {"$set": {f"unread_counts.{current_user['id']}": 0}}
+    )
     
     return {"message": "Conversation marked as read."}
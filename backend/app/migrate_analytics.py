@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Build the analytics rollup index and backfill hourly/daily buckets from existing data
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from analytics import ensure_indexes, rebuild_rollups
+
+async def migrate_analytics(since=None):
+    """Create the rollup index, then recompute buckets (all history, or from `since` on)"""
+    print("🔄 Rebuilding analytics rollups...")
+
+    try:
+        await ensure_indexes()
+        print("   ✅ Rollup index created")
+
+        await rebuild_rollups(since)
+        print(f"   ✅ Rollups rebuilt{f' from {since.isoformat()}' if since else ''}")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        raise
+
+if __name__ == "__main__":
+    # Optional ISO date argument, e.g. 2024-01-01, to only rebuild recent buckets
+    asyncio.run(migrate_analytics(datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None))
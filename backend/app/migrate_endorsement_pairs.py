@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Collapse duplicate endorsements to one per org-player pair and build the unique pair index
+"""
+
+import asyncio
+from endorsements import dedupe_endorsement_pairs, ensure_indexes
+from reputation import rebuild_reputation
+from platform_stats import platform_stats
+
+async def migrate_endorsement_pairs():
+    """Keep the latest endorsement per pair, rebuild the aggregates it feeds, then create indexes"""
+    print("🔄 Removing duplicate endorsements...")
+
+    try:
+        removed = await dedupe_endorsement_pairs()
+        print(f"   ✅ Removed {removed} duplicate endorsements")
+
+        updated = await rebuild_reputation()
+        print(f"   ✅ Rebuilt reputation for {updated} players")
+
+        await platform_stats.recount()
+        print("   ✅ Platform stats recounted")
+
+        await ensure_indexes()
+        print("   ✅ Endorsement indexes created")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(migrate_endorsement_pairs())
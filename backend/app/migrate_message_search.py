@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Build the per-user message search index for messages sent before it existed
+"""
+
+import asyncio
+from message_search import backfill_search_index, ensure_indexes
+
+async def migrate_message_search():
+    """Create the search indexes, then index every existing message"""
+    print("🔄 Building message search index...")
+
+    try:
+        await ensure_indexes()
+        indexed = await backfill_search_index()
+        print(f"   ✅ Indexed {indexed} message postings")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(migrate_message_search())
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Backfill the canonical pair_key on existing conversations and build its unique index
+"""
+
+import asyncio
+from messages import backfill_pair_keys, ensure_indexes
+
+async def migrate_pair_keys():
+    """Backfill pair_key, merging duplicate direct conversations, then create indexes"""
+    print("🔄 Backfilling conversation pair keys...")
+
+    try:
+        updated = await backfill_pair_keys()
+        print(f"   ✅ Backfilled {updated} conversations")
+
+        await ensure_indexes()
+        print("   ✅ Conversation indexes created")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(migrate_pair_keys())
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Rebuild player reputation aggregates from endorsements and build the player directory indexes
+"""
+
+import asyncio
+from reputation import rebuild_reputation
+from players import ensure_indexes
+
+async def migrate_reputation():
+    """Recompute endorsement counts, rating sums and histograms on every player, then create the directory indexes"""
+    print("🔄 Rebuilding player reputation aggregates...")
+
+    try:
+        updated = await rebuild_reputation()
+        print(f"   ✅ Updated {updated} players")
+
+        await ensure_indexes()
+        print("   ✅ Player directory indexes created")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(migrate_reputation())
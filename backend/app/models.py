@@ -223,6 +223,13 @@ class Sponsor(BaseModel):
 
 # --- Helper Functions for Data Serialization (Consistent Naming) ---
 
+# Fields read by user_helper; profile lookups project to these so hashed_password never leaves the database
+USER_PUBLIC_PROJECTION = {
+    "username": 1, "email": 1, "user_type": 1, "bio": 1, "location": 1, "socials": 1,
+    "games": 1, "phone_number": 1, "profile_picture_url": 1, "profile_picture_variants": 1,
+    "endorsement_count": 1, "rating_histogram": 1, "avg_rating": 1, "reputation": 1, "reputation_tier": 1
+}
+
 def user_helper(user_data: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": str(user_data["_id"]),
@@ -234,7 +241,14 @@ def user_helper(user_data: Dict[str, Any]) -> Dict[str, Any]:
         "socials": user_data.get("socials"),
         "games": user_data.get("games"),
         "phone_number": user_data.get("phone_number"),
-        "profile_picture_url": user_data.get("profile_picture_url")
+        "profile_picture_url": user_data.get("profile_picture_url"),
+        "profile_picture_variants": user_data.get("profile_picture_variants"),
+        # Reputation aggregates, maintained incrementally on players
+        "endorsement_count": user_data.get("endorsement_count", 0),
+        "avg_rating": user_data.get("avg_rating"),
+        "rating_histogram": user_data.get("rating_histogram"),
+        "reputation": user_data.get("reputation"),
+        "reputation_tier": user_data.get("reputation_tier")
     }
 
 def gig_helper(gigs_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -340,3 +354,36 @@ def sponsor_helper(sponsor_data: Dict[str, Any]) -> Dict[str, Any]:
         "verified": sponsor_data.get("verified"),
         "created_at": sponsor_data.get("created_at").isoformat() if sponsor_data.get("created_at") else None,
     }
+
+def conversation_helper(convo_data: Dict[str, Any], current_user_id: Optional[str] = None) -> Dict[str, Any]:
+    last_message = convo_data.get("last_message")
+    return {
+        "id": str(convo_data["_id"]),
+        "participants": [str(p) for p in convo_data.get("participants", [])],
+        "participant_details": [
+            {
+                "id": str(p["_id"]),
+                "username": p.get("username"),
+                "profile_picture_url": p.get("profile_picture_url"),
+            }
+            for p in convo_data.get("participant_details", [])
+        ],
+        "last_message": {
+            "text": last_message.get("text"),
+            "sender_id": str(last_message.get("sender_id")),
+            "created_at": last_message.get("created_at").isoformat() if last_message.get("created_at") else None,
+        } if last_message else None,
+        "unread_count": convo_data.get("unread_counts", {}).get(current_user_id, 0) if current_user_id else 0,
+        "created_at": convo_data.get("created_at").isoformat() if convo_data.get("created_at") else None,
+        "updated_at": convo_data.get("updated_at").isoformat() if convo_data.get("updated_at") else None,
+    }
+
+def message_helper(message_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(message_data["_id"]),
+        "conversation_id": str(message_data.get("conversation_id")),
+        "sender_id": str(message_data.get("sender_id")),
+        "text": message_data.get("text"),
+        "created_at": message_data.get("created_at").isoformat() if message_data.get("created_at") else None,
+        "read_by": [str(r) for r in message_data.get("read_by", [])],
+    }
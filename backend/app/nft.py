@@ -5,6 +5,8 @@ from bson.errors import InvalidId
 from datetime import datetime, timezone
 import models # Import models
 from auth import get_current_user # Import get_current_user from auth
+from platform_stats import platform_stats
+from reputation import REPUTATION_PROJECTION, NFT_MIN_ENDORSEMENTS, reputation_tier
 
 router = APIRouter()
 
@@ -18,7 +20,7 @@ async def mint_nft(user_id: str = Query(...), current_user: models.User = Depend
     except InvalidId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid User ID format.")
 
-    user = await db["users"].find_one({"_id": user_object_id})
+    user = await db["users"].find_one({"_id": user_object_id}, {"username": 1, **REPUTATION_PROJECTION})
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
 
@@ -26,21 +28,14 @@ async def mint_nft(user_id: str = Query(...), current_user: models.User = Depend
     if existing_nft:
         return models.soulbound_nft_helper(existing_nft)
 
-    endorsements_cursor = db["endorsements"].find({"endorsed_id": user_object_id})
-    endorsements = await endorsements_cursor.to_list(length=1000)
+    # Materialized on the user by endorse_user/delete_endorsement
+    endorsement_count = user.get("endorsement_count", 0)
+    if endorsement_count < NFT_MIN_ENDORSEMENTS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Not enough endorsements to mint NFT (requires at least {NFT_MIN_ENDORSEMENTS}).")
 
-    if len(endorsements) < 3:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough endorsements to mint NFT (requires at least 3).")
-
-    avg_rating = sum(e["rating"] for e in endorsements) / len(endorsements)
-    
-    if avg_rating >= 4.7:
-        reputation = "Gold SkillLink Talent"
-    elif avg_rating >= 4.3:
-        reputation = "Silver SkillLink Talent"
-    elif avg_rating >= 4.0:
-        reputation = "Bronze SkillLink Talent"
-    else:
+    # Evaluated from the current totals rather than the batch-computed reputation_tier, which may lag
+    reputation = reputation_tier(endorsement_count, user.get("rating_sum", 0))
+    if reputation is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Average rating too low to mint NFT (requires at least 4.0).")
 
     nft_data = {
@@ -51,6 +46,7 @@ async def mint_nft(user_id: str = Query(...), current_user: models.User = Depend
     }
 
     new_nft = await db["soulbound_nfts"].insert_one(nft_data)
+    await platform_stats.increment(nfts_minted=1)
     created_nft = await db["soulbound_nfts"].find_one({"_id": new_nft.inserted_id})
     
     return {
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Platform-wide counters kept in one document and bumped with $inc on every write path, so
+# /admin/stats reads a single document instead of counting whole collections. A periodic exact
+# recount corrects any drift (failed increments, writes made outside the API).
+STATS_COLLECTION = "platform_stats"
+STATS_DOCUMENT_ID = "global"
+PLATFORM_STATS_TTL_SECONDS = float(os.getenv("PLATFORM_STATS_TTL_SECONDS", 10))
+PLATFORM_STATS_RECOUNT_SECONDS = int(os.getenv("PLATFORM_STATS_RECOUNT_SECONDS", 3600))
+
+# Counter name -> (collection, filter) used for the exact recount
+COUNTERS = {
+    "users_total": ("users", {}),
+    "players": ("users", {"user_type": "player"}),
+    "orgs": ("users", {"user_type": "org"}),
+    "gigs": ("gigs", {}),
+    "applications": ("applications", {}),
+    "endorsements": ("endorsements", {}),
+    "nfts_minted": ("soulbound_nfts", {}),
+}
+
+
+def user_counters(user_type: Optional[str]) -> Dict[str, int]:
+    counters = {"users_total": 1}
+    if user_type == "player":
+        counters["players"] = 1
+    elif user_type == "org":
+        counters["orgs"] = 1
+    return counters
+
+
+class PlatformStats:
+    def __init__(self, ttl_seconds: float = PLATFORM_STATS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def increment(self, **deltas: int):
+        """Apply counter deltas after a successful write. Never fails the write itself."""
+        try:
+            await db[STATS_COLLECTION].update_one(
+                {"_id": STATS_DOCUMENT_ID}, {"$inc": deltas}, upsert=True
+            )
+        except Exception as e:
+            logger.warning("platform_stats.increment_failed", extra={"error": type(e).__name__})
+
+    async def recount(self) -> Dict[str, int]:
+        """Count every collection exactly (concurrently) and overwrite the stored counters."""
+        names = list(COUNTERS)
+        counts = await asyncio.gather(*(
+            db[collection].count_documents(query_filter) for collection, query_filter in COUNTERS.values()
+        ))
+        stats = dict(zip(names, counts))
+        await db[STATS_COLLECTION].update_one(
+            {"_id": STATS_DOCUMENT_ID},
+            {"$set": {**stats, "recounted_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        return stats
+
+    async def get(self) -> Dict[str, int]:
+        """Serve the counters from memory, re-reading the stats document at most once per TTL."""
+        if self._cached is not None and time.monotonic() < self._cached_until:
+            return self._cached
+
+        document = await db[STATS_COLLECTION].find_one({"_id": STATS_DOCUMENT_ID})
+        if document is None or document.get("recounted_at") is None:
+            stats = await self.recount()
+        else:
+            stats = {name: max(0, document.get(name, 0)) for name in COUNTERS}
+
+        self._cached = stats
+        self._cached_until = time.monotonic() + self.ttl_seconds
+        return stats
+
+    async def start(self):
+        self._task = asyncio.create_task(self._recount_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _recount_periodically(self):
+        while True:
+            await asyncio.sleep(PLATFORM_STATS_RECOUNT_SECONDS)
+            try:
+                # Every worker runs this loop; skip if another worker recounted recently
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=PLATFORM_STATS_RECOUNT_SECONDS / 2)
+                recent = await db[STATS_COLLECTION].find_one(
+                    {"_id": STATS_DOCUMENT_ID, "recounted_at": {"$gte": cutoff}}, {"_id": 1}
+                )
+                if recent is None:
+                    await self.recount()
+            except Exception as e:
+                logger.warning("platform_stats.recount_failed", extra={"error": type(e).__name__})
+
+
+platform_stats = PlatformStats()
@@ -0,0 +1,169 @@
+import os
+import time
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from database import db
+import models
+
+router = APIRouter()
+
+# Leaderboards read the top of the (user_type[, games], reputation, _id) indexes; each worker keeps
+# the top LEADERBOARD_MAX_LIMIT per game for a few seconds because the board is read far more than it changes
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_CACHE_TTL_SECONDS = float(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", 30))
+LEADERBOARD_CACHE_SIZE = 256
+# Players need this many endorsements to be ranked, so unrated players (at the prior) stay off the board
+LEADERBOARD_MIN_ENDORSEMENTS = int(os.getenv("LEADERBOARD_MIN_ENDORSEMENTS", 1))
+
+# Case-insensitive matching on games and location; queries must pass the same collation to use the indexes
+PLAYER_SEARCH_COLLATION = {"locale": "en", "strength": 2}
+
+
+async def ensure_indexes():
+    # Equality prefix (user_type, then games or location), then the reputation sort with _id as tie-breaker
+    sort_keys = [("reputation", -1), ("_id", -1)]
+    await db["users"].create_index([("user_type", 1), ("games", 1), *sort_keys], collation=PLAYER_SEARCH_COLLATION)
+    await db["users"].create_index([("user_type", 1), ("location", 1), *sort_keys], collation=PLAYER_SEARCH_COLLATION)
+    await db["users"].create_index([("user_type", 1), *sort_keys], collation=PLAYER_SEARCH_COLLATION)
+
+
+# Players written before the reputation backfill have no reputation field; it sorts as null, after
+# every number in the descending order, and is encoded as "null" so paging carries on through them
+def encode_cursor(player) -> str:
+    reputation = player.get("reputation")
+    return f"{'null' if reputation is None else reputation}_{player['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[float], ObjectId]:
+    try:
+        reputation, player_id = cursor.split("_", 1)
+        return None if reputation == "null" else float(reputation), ObjectId(player_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+def cursor_filter(reputation: Optional[float], player_id: ObjectId) -> Dict[str, Any]:
+    """Players after the cursor in (reputation desc, _id desc) order."""
+    if reputation is None:
+        # {"reputation": None} matches both null and a missing field
+        return {"reputation": None, "_id": {"$lt": player_id}}
+    return {"$or": [
+        {"reputation": {"$lt": reputation}},
+        {"reputation": reputation, "_id": {"$lt": player_id}},
+        {"reputation": None}
+    ]}
+
+
+# ANYONE: Scout players by game, location and rating, best reputation first
+@router.get("/players")
+async def search_players(
+    games: Optional[List[str]] = Query(None),
+    location: Optional[str] = Query(None),
+    min_rating: Optional[float] = Query(None, ge=1, le=5),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None)
+):
+    query_filter = {"user_type": "player"}
+    if games:
+        query_filter["games"] = {"$in": [g.strip() for g in games if g.strip()]}
+    if location:
+        query_filter["location"] = location.strip()
+    if min_rating is not None:
+        query_filter["avg_rating"] = {"$gte": min_rating}
+    if cursor:
+        query_filter.update(cursor_filter(*decode_cursor(cursor)))
+
+    players = await db["users"].find(
+        query_filter, models.USER_PUBLIC_PROJECTION, collation=PLAYER_SEARCH_COLLATION
+    ).sort([("reputation", -1), ("_id", -1)]).limit(limit).to_list(length=limit)
+
+    return {
+        "count": len(players),
+        "results": [models.user_helper(p) for p in players],
+        "next_cursor": encode_cursor(players[-1]) if len(players) == limit else None
+    }
+
+
+_leaderboards: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+
+def _ranked_filter(game: Optional[str]) -> Dict[str, Any]:
+    query_filter: Dict[str, Any] = {"user_type": "player", "endorsement_count": {"$gte": LEADERBOARD_MIN_ENDORSEMENTS}}
+    if game:
+        query_filter["games"] = game
+    return query_filter
+
+
+def leaderboard_entry(rank: int, player) -> dict:
+    return {
+        "rank": rank,
+        "id": str(player["_id"]),
+        "username": player.get("username"),
+        "profile_picture_url": player.get("profile_picture_url"),
+        "avg_rating": player.get("avg_rating"),
+        "endorsement_count": player.get("endorsement_count", 0),
+        "reputation": player.get("reputation")
+    }
+
+
+async def top_players(game: Optional[str]) -> List[Dict[str, Any]]:
+    key = (game or "").lower()
+    cached = _leaderboards.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    players = await db["users"].find(
+        _ranked_filter(game),
+        {"username": 1, "profile_picture_url": 1, "avg_rating": 1, "endorsement_count": 1, "reputation": 1},
+        collation=PLAYER_SEARCH_COLLATION
+    ).sort([("reputation", -1), ("_id", -1)]).limit(LEADERBOARD_MAX_LIMIT).to_list(length=LEADERBOARD_MAX_LIMIT)
+    board = [leaderboard_entry(rank, p) for rank, p in enumerate(players, start=1)]
+
+    _leaderboards[key] = (time.monotonic() + LEADERBOARD_CACHE_TTL_SECONDS, board)
+    _leaderboards.move_to_end(key)
+    while len(_leaderboards) > LEADERBOARD_CACHE_SIZE:
+        _leaderboards.popitem(last=False)
+    return board
+
+
+# ANYONE: Top players globally or for one game, ranked by reputation (rating weighted by endorsement count)
+@router.get("/leaderboard")
+async def get_leaderboard(
+    game: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_MAX_LIMIT)
+):
+    game = game.strip() if game else None
+    board = await top_players(game)
+    return {"game": game, "count": min(limit, len(board)), "results": board[:limit]}
+
+
+# ANYONE: One player's position on the global or a per-game board
+@router.get("/leaderboard/rank/{user_id}")
+async def get_leaderboard_rank(user_id: str, game: Optional[str] = Query(None)):
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid User ID format.")
+
+    game = game.strip() if game else None
+    query_filter = _ranked_filter(game)
+    player = await db["users"].find_one(
+        {"_id": user_object_id, **query_filter},
+        {"username": 1, "profile_picture_url": 1, "avg_rating": 1, "endorsement_count": 1, "reputation": 1},
+        collation=PLAYER_SEARCH_COLLATION
+    )
+    if not player:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player is not ranked on this leaderboard.")
+
+    # Players ahead form a prefix of the (reputation, _id) index range, so the count only scans that prefix
+    ahead = await db["users"].count_documents(
+        {**query_filter, "$or": [
+            {"reputation": {"$gt": player["reputation"]}},
+            {"reputation": player["reputation"], "_id": {"$gt": user_object_id}}
+        ]},
+        collation=PLAYER_SEARCH_COLLATION
+    )
+    return {"game": game, **leaderboard_entry(ahead + 1, player)}
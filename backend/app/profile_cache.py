@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from pubsub import broker
+
+logger = logging.getLogger(__name__)
+
+# Per-worker LRU of serialized public profiles. Writes invalidate the local entry and broadcast
+# the user id so other workers drop theirs too; the TTL bounds staleness for writes that
+# bypass invalidation (e.g. direct database edits).
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 5000))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", 60))
+PROFILE_INVALIDATION_CHANNEL = "profiles:invalidate"
+
+# body, etag, user_type, expires_at
+CachedProfile = Tuple[bytes, str, str, float]
+
+
+def profile_etag(body: bytes) -> str:
+    # The serialized body is hashed, so equal ETags always mean byte-identical responses
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+class ProfileCache:
+    def __init__(self, max_size: int = PROFILE_CACHE_SIZE, ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedProfile]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[CachedProfile]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[3] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry
+
+    def put(self, user_id: str, body: bytes, user_type: str) -> CachedProfile:
+        entry = (body, profile_etag(body), user_type, time.monotonic() + self.ttl_seconds)
+        if self.max_size <= 0:
+            return entry
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    async def invalidate(self, user_id: str):
+        """Drop a profile from this worker's cache and tell the other workers to do the same."""
+        self.discard(user_id)
+        try:
+            await broker.publish(PROFILE_INVALIDATION_CHANNEL, {"user_id": user_id})
+        except Exception as e:
+            # Other workers fall back to the TTL; the write itself has already succeeded
+            logger.warning("profiles.invalidation_publish_failed", extra={"error": type(e).__name__})
+
+    async def invalidate_many(self, user_ids: List[str]):
+        """Like invalidate, for a batch of profiles changed by one write, with a single broadcast."""
+        for user_id in user_ids:
+            self.discard(user_id)
+        try:
+            await broker.publish(PROFILE_INVALIDATION_CHANNEL, {"user_ids": user_ids})
+        except Exception as e:
+            logger.warning("profiles.invalidation_publish_failed", extra={"error": type(e).__name__})
+
+    async def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self):
+        async with broker.subscribe(PROFILE_INVALIDATION_CHANNEL) as queue:
+            while True:
+                event = await queue.get()
+                for user_id in event.get("user_ids") or [event["user_id"]]:
+                    self.discard(user_id)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+profile_cache = ProfileCache()
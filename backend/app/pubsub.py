@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# "memory" fans out inside one process only; "mongo" fans out across every worker via a capped collection.
+# Unset, it is "mongo" whenever start.py runs several workers (it exports WEB_CONCURRENCY), since
+# in-process fanout would never reach the other workers' sockets, caches and revocation filters.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND") or ("mongo" if WEB_CONCURRENCY > 1 else "memory")
+PUBSUB_COLLECTION = os.getenv("PUBSUB_COLLECTION", "pubsub_events")
+PUBSUB_CAPPED_SIZE_BYTES = int(os.getenv("PUBSUB_CAPPED_SIZE_BYTES", 16 * 1024 * 1024))
+# Pause before reopening a dead tail cursor
+PUBSUB_RETRY_SECONDS = 1
+# Events buffered per subscriber before new ones are dropped for a slow socket
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+class InMemoryBroker:
+    """Delivers events to subscribers in this process."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        self._deliver(channel, event)
+
+    def _deliver(self, channel: str, event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping event for slow subscriber on %s", channel)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[channel].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[channel].discard(queue)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+
+class MongoBroker(InMemoryBroker):
+    """Publishes into a capped collection that every worker tails, then delivers locally."""
+
+    def __init__(self, collection_name: str = PUBSUB_COLLECTION):
+        super().__init__()
+        self._collection_name = collection_name
+        self._tail_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            await db.create_collection(self._collection_name, capped=True, size=PUBSUB_CAPPED_SIZE_BYTES)
+        except CollectionInvalid:
+            pass  # Already created by another worker
+        # Only events published after this worker started are delivered; the position is taken before
+        # start() returns so nothing published right after startup is mistaken for an old event
+        latest = await db[self._collection_name].find_one({}, sort=[("$natural", -1)])
+        self._tail_task = asyncio.create_task(self._tail(latest["_id"] if latest else None))
+
+    async def stop(self):
+        if self._tail_task:
+            self._tail_task.cancel()
+            try:
+                await self._tail_task
+            except asyncio.CancelledError:
+                pass
+            self._tail_task = None
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        await db[self._collection_name].insert_one({"channel": channel, "event": event})
+
+    async def _tail(self, last_id: Optional[ObjectId]):
+        collection = db[self._collection_name]
+        while True:
+            try:
+                # ObjectIds from different workers are not ordered by insertion, so a new cursor re-reads the
+                # capped collection in natural (insertion) order and skips up to the last delivered event
+                skipping = last_id is not None and await collection.count_documents({"_id": last_id}, limit=1) > 0
+                if last_id is not None and not skipping:
+                    logger.warning("Pub/sub tail fell behind the capped collection; some events were lost")
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        self._deliver(doc["channel"], doc["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Pub/sub tail cursor failed: %s", e)
+            # Tailable cursors die on an empty collection or when the capped collection rolls over
+            await asyncio.sleep(PUBSUB_RETRY_SECONDS)
+
+
+def create_broker(backend: str = PUBSUB_BACKEND) -> InMemoryBroker:
+    if backend == "mongo":
+        return MongoBroker()
+    if backend == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown PUBSUB_BACKEND: {backend}")
+
+
+broker = create_broker()
@@ -0,0 +1,259 @@
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from jose.exceptions import JWTError
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from starlette.responses import JSONResponse
+from auth import token_cache, decode_access_token
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps buckets per worker; "mongo" shares them across workers/instances
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", 16))
+RATE_LIMIT_EVICTION_SECONDS = float(os.getenv("RATE_LIMIT_EVICTION_SECONDS", 60))
+# Honour X-Forwarded-For only when running behind a trusted proxy (e.g. Railway's edge)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Largest login form (bytes) read to find the email for the per-account bucket
+LOGIN_BODY_LIMIT = int(os.getenv("RATE_LIMIT_LOGIN_BODY_LIMIT", 4096))
+
+
+@dataclass
+class Limit:
+    rate: float      # tokens added per second
+    burst: float     # bucket capacity
+
+    @classmethod
+    def per_minute(cls, count: float, burst: Optional[float] = None) -> "Limit":
+        return cls(rate=count / 60, burst=burst if burst is not None else count)
+
+
+@dataclass
+class RateLimitRule:
+    methods: set
+    path: str                           # exact path, or a prefix ending in "*"
+    per_ip: Optional[Limit] = None
+    per_account: Optional[Limit] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        if method not in self.methods:
+            return False
+        if self.path.endswith("*"):
+            return path.startswith(self.path[:-1])
+        return path == self.path
+
+
+# First matching rule wins. Override with RATE_LIMIT_RULES, a JSON list of
+# {"methods": [...], "path": "...", "per_ip": [per_minute, burst], "per_account": [per_minute, burst]}
+DEFAULT_RULES = [
+    RateLimitRule({"POST"}, "/auth/login", per_ip=Limit.per_minute(20, 10), per_account=Limit.per_minute(5)),
+    RateLimitRule({"POST"}, "/auth/refresh", per_ip=Limit.per_minute(30)),
+    RateLimitRule({"POST"}, "/register", per_ip=Limit.per_minute(5)),
+    RateLimitRule(WRITE_METHODS, "*", per_ip=Limit.per_minute(240, 60), per_account=Limit.per_minute(120, 60)),
+]
+
+
+def load_rules() -> List[RateLimitRule]:
+    raw = os.getenv("RATE_LIMIT_RULES")
+    if not raw:
+        return DEFAULT_RULES
+    rules = []
+    for rule in json.loads(raw):
+        rules.append(RateLimitRule(
+            methods={m.upper() for m in rule.get("methods", WRITE_METHODS)},
+            path=rule["path"],
+            per_ip=Limit.per_minute(*rule["per_ip"]) if rule.get("per_ip") else None,
+            per_account=Limit.per_minute(*rule["per_account"]) if rule.get("per_account") else None,
+        ))
+    return rules
+
+
+class MemoryBuckets:
+    """Token buckets in sharded dicts. Idle buckets (which would have refilled anyway) are
+    evicted one shard at a time, so no single request pays for a full sweep."""
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, eviction_seconds: float = RATE_LIMIT_EVICTION_SECONDS):
+        self._shards: List[Dict[str, Tuple[float, float, float]]] = [{} for _ in range(shards)]
+        self._sweep_interval = eviction_seconds / shards
+        self._next_shard = 0
+        self._last_sweep = time.monotonic()
+
+    async def ensure_indexes(self):
+        pass
+
+    async def consume(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        now = time.monotonic()
+        self._maybe_evict(now)
+        shard = self._shards[hash(key) % len(self._shards)]
+        tokens, updated, _ = shard.get(key, (limit.burst, now, 0.0))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Third field: when the bucket will be full again and can be forgotten
+        shard[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        return allowed, tokens
+
+    def _maybe_evict(self, now: float):
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+        shard = self._shards[self._next_shard]
+        self._next_shard = (self._next_shard + 1) % len(self._shards)
+        for key in [k for k, (_, _, full_at) in shard.items() if full_at <= now]:
+            del shard[key]
+
+
+class MongoBuckets:
+    """Token buckets shared through MongoDB; refill and consume happen in one atomic update."""
+
+    collection = "rate_limit_buckets"
+
+    async def ensure_indexes(self):
+        await db[self.collection].create_index("expires_at", expireAfterSeconds=0)
+
+    async def consume(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        now = datetime.now(timezone.utc)
+        refilled = {"$min": [limit.burst, {"$add": [
+            {"$ifNull": ["$tokens", limit.burst]},
+            {"$multiply": [limit.rate, {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}]}
+        ]}]}
+        bucket = await db[self.collection].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": now + timedelta(seconds=limit.burst / limit.rate)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return bucket["allowed"], bucket["tokens"]
+
+
+def create_buckets(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "mongo":
+        return MongoBuckets()
+    if backend == "memory":
+        return MemoryBuckets()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+buckets = create_buckets()
+
+
+def _client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                # The proxy appends the address it saw; earlier entries are client-supplied
+                return value.decode().split(",")[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _bearer_account(scope) -> Optional[str]:
+    # Only verified tokens identify an account, so nobody can drain another user's bucket
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value.lower().startswith(b"bearer "):
+            token = value[7:].decode()
+            try:
+                claims = token_cache.get(token) or decode_access_token(token)
+            except (JWTError, HTTPException):
+                return None
+            return f"user:{claims['id']}"
+    return None
+
+
+class RateLimitMiddleware:
+    """Per-IP and per-account token buckets in front of the configured routes."""
+
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None):
+        self.app = app
+        self.rules = rules if rules is not None else load_rules()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        rule = next((r for r in self.rules if r.matches(method, path)), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        if rule.per_ip:
+            allowed, tokens = await buckets.consume(f"ip:{_client_ip(scope)}:{rule.path}", rule.per_ip)
+            if not allowed:
+                await self._reject(scope, receive, send, rule.per_ip, tokens, "ip")
+                return
+
+        if rule.per_account:
+            account, receive = await self._account_key(scope, receive)
+            if account:
+                allowed, tokens = await buckets.consume(f"{account}:{rule.path}", rule.per_account)
+                if not allowed:
+                    await self._reject(scope, receive, send, rule.per_account, tokens, "account")
+                    return
+
+        await self.app(scope, receive, send)
+
+    async def _account_key(self, scope, receive):
+        account = _bearer_account(scope)
+        if account or scope["path"] != "/auth/login":
+            return account, receive
+
+        # Login is unauthenticated: key on the submitted email, then replay the buffered body.
+        # Only a small form is read; an oversized body is keyed on the client IP instead.
+        ip_key = f"ip:{_client_ip(scope)}"
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and (not value.isdigit() or int(value) > LOGIN_BODY_LIMIT):
+                return ip_key, receive
+
+        chunks, size, more = [], 0, True
+        while more and size <= LOGIN_BODY_LIMIT:
+            message = await receive()
+            chunk = message.get("body", b"")
+            chunks.append(chunk)
+            size += len(chunk)
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": more}
+            return await receive()
+
+        if more or size > LOGIN_BODY_LIMIT:
+            return ip_key, replay
+        emails = parse_qs(body.decode(errors="ignore")).get("email")
+        return (f"email:{emails[0].lower()}" if emails else ip_key), replay
+
+    async def _reject(self, scope, receive, send, limit: Limit, tokens: float, scope_name: str):
+        retry_after = max(1, math.ceil((1 - tokens) / limit.rate))
+        logger.info("rate_limit.rejected", extra={"path": scope["path"], "scope": scope_name})
+        response = JSONResponse(
+            {"detail": "Too many requests, please slow down."},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,40 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, status
+from auth import get_current_user
+from pubsub import broker, user_channel
+
+router = APIRouter()
+
+# Real-time delivery of chat messages and notifications for the authenticated user.
+# Browsers cannot set an Authorization header on a WebSocket, so the JWT comes in the query string.
+@router.websocket("/ws")
+async def user_events(websocket: WebSocket, token: str = Query(...)):
+    try:
+        current_user = await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with broker.subscribe(user_channel(current_user["id"])) as queue:
+        receiver = asyncio.create_task(_drain_client(websocket))
+        try:
+            while not receiver.done():
+                getter = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await websocket.send_json(getter.result())
+                else:
+                    getter.cancel()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+
+# Reads (and ignores) client frames so a disconnect is noticed even when no events are flowing
+async def _drain_client(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
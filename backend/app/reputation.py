@@ -0,0 +1,127 @@
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from database import db
+
+# Players are ranked by a Bayesian average of their endorsement ratings: a handful of 5-star
+# endorsements does not outrank a long record of 4.8s, because every player starts with
+# REPUTATION_PRIOR_WEIGHT virtual endorsements at REPUTATION_PRIOR_MEAN.
+REPUTATION_PRIOR_MEAN = 3.0
+REPUTATION_PRIOR_WEIGHT = 5
+
+RATINGS = range(1, 6)
+
+# NFT / badge tiers: minimum average rating, best first
+NFT_MIN_ENDORSEMENTS = 3
+REPUTATION_TIERS = [
+    (4.7, "Gold SkillLink Talent"),
+    (4.3, "Silver SkillLink Talent"),
+    (4.0, "Bronze SkillLink Talent"),
+]
+
+# Aggregates kept on each player so reputation reads never touch the endorsements collection
+REPUTATION_PROJECTION = {
+    "endorsement_count": 1, "rating_sum": 1, "rating_histogram": 1, "avg_rating": 1, "reputation": 1,
+    "reputation_tier": 1
+}
+
+
+def reputation_tier(endorsement_count: int, rating_sum: float) -> Optional[str]:
+    """Gold/Silver/Bronze tier for the given totals, or None if the player does not qualify."""
+    if endorsement_count < NFT_MIN_ENDORSEMENTS:
+        return None
+    avg_rating = rating_sum / endorsement_count
+    return next((tier for minimum, tier in REPUTATION_TIERS if avg_rating >= minimum), None)
+
+
+def empty_histogram() -> Dict[str, int]:
+    return {str(rating): 0 for rating in RATINGS}
+
+
+def reputation_fields(endorsement_count: int, rating_sum: float, rating_histogram: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """The precomputed fields stored on a player for directory filtering, sorting and badges."""
+    return {
+        "endorsement_count": endorsement_count,
+        "rating_sum": rating_sum,
+        "rating_histogram": {**empty_histogram(), **(rating_histogram or {})},
+        "reputation_tier": reputation_tier(endorsement_count, rating_sum),
+        "avg_rating": round(rating_sum / endorsement_count, 2) if endorsement_count else None,
+        "reputation": round(
+            (rating_sum + REPUTATION_PRIOR_MEAN * REPUTATION_PRIOR_WEIGHT) / (endorsement_count + REPUTATION_PRIOR_WEIGHT), 4
+        )
+    }
+
+
+def _inc(field: str, delta: float) -> Dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+
+
+async def apply_endorsement(user_id: ObjectId, rating: Optional[int] = None, previous_rating: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Fold one endorsement change into a player's aggregates: a new endorsement (rating only),
+    a removed one (previous_rating only) or a re-rating (both, count unchanged).
+
+    The counters are incremented inside an update pipeline so the derived average and
+    reputation are recomputed from the new totals in the same atomic write. The tier is left
+    to the batch evaluator, which picks the player up through reputation_updated_at.
+    """
+    histogram_deltas: Dict[int, int] = {}
+    if rating is not None:
+        histogram_deltas[rating] = histogram_deltas.get(rating, 0) + 1
+    if previous_rating is not None:
+        histogram_deltas[previous_rating] = histogram_deltas.get(previous_rating, 0) - 1
+    count = _inc("endorsement_count", (rating is not None) - (previous_rating is not None))
+    total = _inc("rating_sum", (rating or 0) - (previous_rating or 0))
+    return await db["users"].find_one_and_update(
+        {"_id": user_id},
+        [
+            {"$set": {
+                "endorsement_count": count,
+                "rating_sum": total,
+                "rating_histogram": {"$mergeObjects": [
+                    empty_histogram(),
+                    {"$ifNull": ["$rating_histogram", {}]},
+                    {str(r): _inc(f"rating_histogram.{r}", d) for r, d in histogram_deltas.items()}
+                ]},
+                "reputation_updated_at": "$$NOW"
+            }},
+            {"$set": {
+                "avg_rating": {"$cond": [
+                    {"$gt": ["$endorsement_count", 0]},
+                    {"$round": [{"$divide": ["$rating_sum", "$endorsement_count"]}, 2]},
+                    None
+                ]},
+                "reputation": {"$round": [{"$divide": [
+                    {"$add": ["$rating_sum", REPUTATION_PRIOR_MEAN * REPUTATION_PRIOR_WEIGHT]},
+                    {"$add": ["$endorsement_count", REPUTATION_PRIOR_WEIGHT]}
+                ]}, 4]}
+            }}
+        ],
+        projection=REPUTATION_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def rebuild_reputation() -> int:
+    """Recompute every player's aggregates from the endorsements collection. Safe to re-run;
+    use it to backfill and to repair drift."""
+    totals: Dict[ObjectId, Dict[str, Any]] = {}
+    async for row in db["endorsements"].aggregate([
+        {"$group": {"_id": {"user": "$endorsed_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]):
+        user_totals = totals.setdefault(row["_id"]["user"], {"count": 0, "rating_sum": 0, "histogram": {}})
+        user_totals["count"] += row["count"]
+        user_totals["rating_sum"] += row["count"] * row["_id"]["rating"]
+        user_totals["histogram"][str(row["_id"]["rating"])] = row["count"]
+
+    updates, updated = [], 0
+    async for player in db["users"].find({"user_type": "player"}, {"_id": 1}):
+        row = totals.get(player["_id"])
+        fields = reputation_fields(row["count"], row["rating_sum"], row["histogram"]) if row else reputation_fields(0, 0)
+        updates.append(UpdateOne({"_id": player["_id"]}, {"$set": fields}))
+        updated += 1
+        if len(updates) == 1000:
+            await db["users"].bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await db["users"].bulk_write(updates, ordered=False)
+    return updated
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+from database import db
+from reputation import reputation_tier
+from profile_cache import profile_cache
+
+logger = logging.getLogger(__name__)
+
+# Batch evaluator for the precomputed reputation_tier badge. apply_endorsement stamps
+# reputation_updated_at (server clock); each run only streams players stamped at or after the
+# previous run's high-water mark, so unchanged players are never read.
+JOB_STATE_COLLECTION = "job_state"
+JOB_ID = "reputation_tiers"
+REPUTATION_TIER_INTERVAL_SECONDS = int(os.getenv("REPUTATION_TIER_INTERVAL_SECONDS", 300))
+REPUTATION_TIER_BATCH_SIZE = int(os.getenv("REPUTATION_TIER_BATCH_SIZE", 500))
+# The high-water mark is the run's start minus this margin, covering skew between this clock and
+# the server's $$NOW and writes still in flight when the scan starts
+REPUTATION_TIER_SKEW_SECONDS = int(os.getenv("REPUTATION_TIER_SKEW_SECONDS", 60))
+
+
+async def ensure_indexes():
+    await db["users"].create_index("reputation_updated_at", sparse=True)
+
+
+async def _write_batch(batch: List[Dict[str, Any]]) -> int:
+    """Evaluate a batch and write it with one update_many per tier that actually changed."""
+    ids_by_tier: Dict[Optional[str], List[Any]] = {}
+    for player in batch:
+        tier = reputation_tier(player.get("endorsement_count", 0), player.get("rating_sum", 0))
+        if tier != player.get("reputation_tier"):
+            ids_by_tier.setdefault(tier, []).append(player["_id"])
+
+    for tier, ids in ids_by_tier.items():
+        await db["users"].update_many({"_id": {"$in": ids}}, {"$set": {"reputation_tier": tier}})
+        # Cached public profiles embed the tier
+        await profile_cache.invalidate_many([str(player_id) for player_id in ids])
+    return sum(len(ids) for ids in ids_by_tier.values())
+
+
+async def evaluate_tiers(since: Optional[datetime] = None) -> Dict[str, Any]:
+    """Re-evaluate tiers for players whose aggregates changed at or after `since` (all if None).
+
+    Returns the number of players scanned and changed, and the next run's high-water mark.
+    """
+    # Not the largest stamp seen: the scan is unordered, so a player stamped during it with an
+    # earlier time than one already read would fall below that mark and never be re-evaluated
+    high_water = datetime.now(timezone.utc) - timedelta(seconds=REPUTATION_TIER_SKEW_SECONDS)
+    query_filter: Dict[str, Any] = {"user_type": "player"}
+    if since is not None:
+        # $gte: players stamped in the same millisecond as the last mark are re-read, never missed
+        query_filter["reputation_updated_at"] = {"$gte": since}
+
+    cursor = db["users"].find(
+        query_filter,
+        {"endorsement_count": 1, "rating_sum": 1, "reputation_tier": 1}
+    ).batch_size(REPUTATION_TIER_BATCH_SIZE)
+
+    scanned, changed = 0, 0
+    batch: List[Dict[str, Any]] = []
+    async for player in cursor:
+        batch.append(player)
+        if len(batch) == REPUTATION_TIER_BATCH_SIZE:
+            changed += await _write_batch(batch)
+            scanned += len(batch)
+            batch = []
+    if batch:
+        changed += await _write_batch(batch)
+        scanned += len(batch)
+
+    return {"scanned": scanned, "changed": changed, "high_water": high_water}
+
+
+async def run_incremental() -> Optional[Dict[str, Any]]:
+    """One incremental run, guarded by a lease so only one worker evaluates at a time."""
+    now = datetime.now(timezone.utc)
+    try:
+        # Matches a free lease (or creates the state document); a held lease makes the upsert collide
+        state = await db[JOB_STATE_COLLECTION].find_one_and_update(
+            {"_id": JOB_ID, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=REPUTATION_TIER_INTERVAL_SECONDS)}},
+            upsert=True
+        ) or {}
+    except DuplicateKeyError:
+        return None  # Another worker is running the job
+
+    result = await evaluate_tiers(state.get("high_water"))
+    await db[JOB_STATE_COLLECTION].update_one(
+        {"_id": JOB_ID},
+        {"$set": {
+            "high_water": result["high_water"],
+            "last_run_at": datetime.now(timezone.utc),
+            "last_scanned": result["scanned"],
+            "last_changed": result["changed"],
+            "lease_until": None
+        }}
+    )
+    logger.info("reputation_tiers.run", extra={"scanned": result["scanned"], "changed": result["changed"]})
+    return result
+
+
+class ReputationTierJob:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await run_incremental()
+            except Exception as e:
+                logger.warning("reputation_tiers.run_failed", extra={"error": type(e).__name__})
+            await asyncio.sleep(REPUTATION_TIER_INTERVAL_SECONDS)
+
+
+reputation_tier_job = ReputationTierJob()
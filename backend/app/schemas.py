@@ -29,6 +29,15 @@ class UserOut(BaseModel):
     # New fields for profile customization
     phone_number: Optional[str] = None
     profile_picture_url: Optional[str] = None
+    # Resized avatars keyed by size ("64", "256", "512", "original"), each with url and webp_url
+    profile_picture_variants: Optional[dict] = None
+    # Reputation aggregates (players): rating_histogram maps "1".."5" to endorsement counts
+    endorsement_count: int = 0
+    avg_rating: Optional[float] = None
+    rating_histogram: Optional[dict] = None
+    reputation: Optional[float] = None
+    # Gold/Silver/Bronze badge, precomputed by the reputation tier job
+    reputation_tier: Optional[str] = None
 
     class Config:
         validate_by_name = True
@@ -123,9 +132,22 @@ class ConversationCreate(BaseModel):
     class Config:
         validate_by_name = True
 
+class ConversationParticipant(BaseModel):
+    id: str
+    username: Optional[str] = None
+    profile_picture_url: Optional[str] = None
+
+class ConversationLastMessage(BaseModel):
+    text: str
+    sender_id: str
+    created_at: datetime
+
 class ConversationOut(BaseModel):
     id: str
     participants: List[str]
+    participant_details: List[ConversationParticipant] = []
+    last_message: Optional[ConversationLastMessage] = None
+    unread_count: int = 0
     created_at: datetime
     updated_at: datetime
 
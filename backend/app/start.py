@@ -1,7 +1,128 @@
 #!/usr/bin/env python3
-import uvicorn
+"""
+Production entry point: gunicorn supervising uvicorn workers.
+
+Gunicorn restarts workers that crash or hit WORKER_MAX_REQUESTS, and drains them gracefully on
+SIGTERM. Each worker runs the FastAPI lifespan and therefore owns its own Mongo pool.
+Pass --reload for a single auto-reloading uvicorn process during development.
+"""
+
+import logging
 import os
+import sys
+import uvicorn
+from cpus import available_cpus
+
+logger = logging.getLogger("start")
+
+PORT = int(os.getenv("PORT", 8000))
+HOST = os.getenv("HOST", "0.0.0.0")
+# Seconds a worker gets to finish in-flight requests (and run lifespan shutdown) after SIGTERM
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+# Workers silent for this long are killed and replaced
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", 60))
+KEEPALIVE = int(os.getenv("KEEPALIVE", 5))
+# Recycle each worker after roughly this many requests (0 disables) to contain slow leaks;
+# the jitter keeps workers from all restarting at once
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", 10000))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", 1000))
+# Pin worker N to CPU N (mod available CPUs); Linux only
+WORKER_CPU_AFFINITY = os.getenv("WORKER_CPU_AFFINITY", "false").lower() == "true"
+
+
+def worker_count() -> int:
+    # WEB_CONCURRENCY is the conventional override (Heroku/Railway); otherwise one worker per CPU
+    configured = os.getenv("WEB_CONCURRENCY")
+    return int(configured) if configured else len(available_cpus())
+
+
+def export_worker_count(workers: int):
+    # Workers inherit the environment; per-process pools (thumbnails) divide the CPUs by this count
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def event_loop_implementation() -> str:
+    # uvicorn's "auto" settings pick these when installed (uvicorn[standard] ships both)
+    parts = []
+    for module, fallback in (("uvloop", "asyncio"), ("httptools", "h11")):
+        try:
+            __import__(module)
+            parts.append(module)
+        except ImportError:
+            parts.append(fallback)
+    return "/".join(parts)
+
+
+def post_fork(server, worker):
+    if not WORKER_CPU_AFFINITY or not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = available_cpus()
+    # worker.age increases with every spawn, so replacements rotate across CPUs too
+    cpu = cpus[worker.age % len(cpus)]
+    os.sched_setaffinity(0, {cpu})
+    server.log.info("Pinned worker %s to CPU %s", worker.pid, cpu)
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class SkillLinkApplication(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    workers = worker_count()
+    export_worker_count(workers)
+    logger.info("Starting %s workers (%s) on %s:%s", workers, event_loop_implementation(), HOST, PORT)
+    SkillLinkApplication({
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "max_requests": WORKER_MAX_REQUESTS,
+        "max_requests_jitter": WORKER_MAX_REQUESTS_JITTER if WORKER_MAX_REQUESTS else 0,
+        "post_fork": post_fork,
+        "accesslog": "-",
+        "errorlog": "-",
+    }).run()
+
+
+def run_uvicorn(reload: bool):
+    # Fallback where gunicorn is unavailable (e.g. Windows). uvicorn's supervisor does not replace
+    # exited workers, so limit_max_requests must stay off here or workers would simply disappear.
+    workers = 1 if reload else worker_count()
+    export_worker_count(workers)
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        reload=reload,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+    )
+
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    if "--reload" in sys.argv:
+        run_uvicorn(reload=True)
+    else:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            logger.warning("gunicorn is not installed; falling back to uvicorn workers without recycling")
+            run_uvicorn(reload=False)
+        else:
+            run_gunicorn()
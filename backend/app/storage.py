@@ -0,0 +1,302 @@
+import asyncio
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, RedirectResponse, Response, StreamingResponse, PlainTextResponse
+from starlette.staticfiles import StaticFiles
+
+# "local" keeps uploads on this instance's disk; "s3" stores them in any S3-compatible bucket
+# (AWS, MinIO, or a moto server for local testing) so every instance sees the same files.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+# Define the directory for uploads (relative to where main.py is run)
+UPLOAD_DIRECTORY = Path(os.getenv("UPLOAD_DIRECTORY", "uploads"))
+UPLOAD_DIRECTORY.mkdir(exist_ok=True) # Create directory if it doesn't exist
+
+# Public URL prefix for uploaded files, e.g. https://api.example.com/uploads or a CDN origin
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+UPLOADS_BASE_URL = os.getenv("UPLOADS_BASE_URL", f"{PUBLIC_BASE_URL}/uploads").rstrip("/")
+
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "uploads/")
+S3_PRESIGN_EXPIRES_SECONDS = int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", 3600))
+S3_PART_BYTES = 8 * 1024 * 1024  # S3 requires >= 5 MB for every part but the last
+
+# Uploads are named by content hash, so a URL always refers to the same bytes and can be cached forever
+CONTENT_HASH_LENGTH = 32
+CONTENT_ADDRESSED_NAME = re.compile(rf"^[0-9a-f]{{{CONTENT_HASH_LENGTH}}}(_\d+)?\.[a-z0-9]+$")
+SAFE_UPLOAD_NAME = re.compile(r"^[A-Za-z0-9_-]+\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+def upload_url(file_name: str) -> str:
+    return f"{UPLOADS_BASE_URL}/{file_name}"
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" range into inclusive (start, end). Raises ValueError if unsatisfiable."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # Multi-range and other units: fall back to the full body
+    start_text, _, end_text = spec.strip().partition("-")
+    if not start_text:
+        if not end_text.isdigit() or int(end_text) == 0:
+            raise ValueError(range_header)
+        return max(0, size - int(end_text)), size - 1
+    if not start_text.isdigit() or (end_text and not end_text.isdigit()):
+        return None
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError(range_header)
+    return start, end
+
+
+async def _iter_file_range(path: str, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(UPLOAD_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class UploadStaticFiles(StaticFiles):
+    """Serves content-addressed uploads with strong ETags, immutable caching and Range requests."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        name = os.path.basename(full_path)
+        if not CONTENT_ADDRESSED_NAME.match(name):
+            # Legacy names are overwritten in place, so they keep Starlette's default validators
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        size = stat_result.st_size
+        # The name is the content hash, which makes it a strong validator
+        etag = f'"{name.rsplit(".", 1)[0]}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+
+        if_none_match = request_headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            if byte_range:
+                start, end = byte_range
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                return StreamingResponse(
+                    _iter_file_range(full_path, start, end),
+                    status_code=206,
+                    media_type=media_type,
+                    headers={
+                        **headers,
+                        "Content-Range": f"bytes {start}-{end}/{size}",
+                        "Content-Length": str(end - start + 1)
+                    }
+                )
+
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+
+class LocalWriter:
+    """Writes to a temp file in UPLOAD_DIRECTORY and renames it into place on commit."""
+
+    def __init__(self):
+        self._temp_path = UPLOAD_DIRECTORY / f".{uuid.uuid4().hex}.tmp"
+        self._file = None
+
+    async def write(self, chunk: bytes):
+        if self._file is None:
+            self._file = await asyncio.to_thread(open, self._temp_path, "wb")
+        await asyncio.to_thread(self._file.write, chunk)
+
+    async def commit(self, name: str, content_type: str):
+        await asyncio.to_thread(self._file.close)
+        final_path = UPLOAD_DIRECTORY / name
+        if await asyncio.to_thread(final_path.exists):
+            await asyncio.to_thread(self._temp_path.unlink)  # Same bytes already stored
+        else:
+            await asyncio.to_thread(os.replace, self._temp_path, final_path)
+
+    async def abort(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+        await asyncio.to_thread(self._temp_path.unlink, True)
+
+
+class LocalStorage:
+    def writer(self) -> LocalWriter:
+        return LocalWriter()
+
+    async def put_file(self, path: Path, name: str, content_type: str):
+        final_path = UPLOAD_DIRECTORY / name
+        if not await asyncio.to_thread(final_path.exists):
+            await asyncio.to_thread(shutil.copyfile, path, final_path.with_name(f".{name}.tmp"))
+            await asyncio.to_thread(os.replace, final_path.with_name(f".{name}.tmp"), final_path)
+
+    @asynccontextmanager
+    async def local_copy(self, name: str) -> AsyncIterator[Path]:
+        yield UPLOAD_DIRECTORY / name
+
+    def asgi_app(self):
+        return UploadStaticFiles(directory=UPLOAD_DIRECTORY)
+
+
+class S3Writer:
+    """Streams chunks into an S3 multipart upload under a temporary key. On commit the object is
+    copied server-side to its content-addressed name, unless that object already exists."""
+
+    def __init__(self, storage: "S3Storage"):
+        self._storage = storage
+        self._temp_key = f"{S3_KEY_PREFIX}tmp/{uuid.uuid4().hex}"
+        self._upload_id = None
+        self._parts = []
+        self._buffer = bytearray()
+
+    async def _flush_part(self):
+        client = self._storage.client
+        if self._upload_id is None:
+            response = await asyncio.to_thread(
+                client.create_multipart_upload, Bucket=S3_BUCKET, Key=self._temp_key
+            )
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = await asyncio.to_thread(
+            client.upload_part, Bucket=S3_BUCKET, Key=self._temp_key,
+            UploadId=self._upload_id, PartNumber=part_number, Body=bytes(self._buffer)
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer.clear()
+
+    async def write(self, chunk: bytes):
+        self._buffer.extend(chunk)
+        if len(self._buffer) >= S3_PART_BYTES:
+            await self._flush_part()
+
+    async def commit(self, name: str, content_type: str):
+        client = self._storage.client
+        await self._flush_part()
+        await asyncio.to_thread(
+            client.complete_multipart_upload, Bucket=S3_BUCKET, Key=self._temp_key,
+            UploadId=self._upload_id, MultipartUpload={"Parts": self._parts}
+        )
+        try:
+            if not await self._storage.exists(name):
+                await asyncio.to_thread(
+                    client.copy_object, Bucket=S3_BUCKET, Key=self._storage.key(name),
+                    CopySource={"Bucket": S3_BUCKET, "Key": self._temp_key},
+                    ContentType=content_type, CacheControl=IMMUTABLE_CACHE_CONTROL,
+                    MetadataDirective="REPLACE"
+                )
+        finally:
+            await asyncio.to_thread(client.delete_object, Bucket=S3_BUCKET, Key=self._temp_key)
+
+    async def abort(self):
+        if self._upload_id is not None:
+            await asyncio.to_thread(
+                self._storage.client.abort_multipart_upload,
+                Bucket=S3_BUCKET, Key=self._temp_key, UploadId=self._upload_id
+            )
+
+
+class S3Storage:
+    def __init__(self):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3).")
+        if not S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET to be set.")
+        # boto3 clients are thread-safe; credentials come from the standard AWS_* variables
+        self.client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION)
+
+    def key(self, name: str) -> str:
+        return f"{S3_KEY_PREFIX}{name}"
+
+    async def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=S3_BUCKET, Key=self.key(name))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def writer(self) -> S3Writer:
+        return S3Writer(self)
+
+    async def put_file(self, path: Path, name: str, content_type: str):
+        if not await self.exists(name):
+            # upload_file switches to a multipart upload for large files on its own
+            await asyncio.to_thread(
+                self.client.upload_file, str(path), S3_BUCKET, self.key(name),
+                ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL}
+            )
+
+    @asynccontextmanager
+    async def local_copy(self, name: str) -> AsyncIterator[Path]:
+        temp_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="skilllink-")
+        path = Path(temp_dir) / name
+        try:
+            await asyncio.to_thread(self.client.download_file, S3_BUCKET, self.key(name), str(path))
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, temp_dir, True)
+
+    def presigned_url(self, name: str) -> str:
+        # Signing is a local computation; no request is made to S3
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": S3_BUCKET, "Key": self.key(name)},
+            ExpiresIn=S3_PRESIGN_EXPIRES_SECONDS
+        )
+
+    def asgi_app(self):
+        storage = self
+
+        async def redirect_to_presigned(scope, receive, send):
+            # Stored URLs keep pointing at /uploads/<name>; the bytes come straight from the bucket
+            name = scope["path"].lstrip("/")
+            if scope["type"] != "http" or not SAFE_UPLOAD_NAME.match(name):
+                response = PlainTextResponse("Not Found", status_code=404)
+            else:
+                response = RedirectResponse(
+                    storage.presigned_url(name),
+                    status_code=307,
+                    headers={"Cache-Control": f"private, max-age={S3_PRESIGN_EXPIRES_SECONDS // 2}"}
+                )
+            await response(scope, receive, send)
+
+        return redirect_to_presigned
+
+
+def create_storage(backend: str = STORAGE_BACKEND):
+    if backend == "s3":
+        return S3Storage()
+    if backend == "local":
+        return LocalStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_storage()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+from bson import ObjectId
+from database import db
+from storage import storage, upload_url
+from profile_cache import profile_cache
+from cpus import available_cpus
+
+logger = logging.getLogger(__name__)
+
+# Square bounding boxes (px) for avatar variants; each is written in the original format and as WebP
+THUMBNAIL_SIZES = [int(s) for s in os.getenv("THUMBNAIL_SIZES", "64,256,512").split(",") if s.strip()]
+# Every web worker gets its own pool, so the default splits the available CPUs (affinity and cgroup
+# quota aware) across the WEB_CONCURRENCY workers that start.py exports; one process is assumed otherwise
+THUMBNAIL_WORKERS = int(os.getenv(
+    "THUMBNAIL_WORKERS", max(1, len(available_cpus()) // max(1, int(os.getenv("WEB_CONCURRENCY", 1))))
+))
+WEBP_QUALITY = int(os.getenv("THUMBNAIL_WEBP_QUALITY", 80))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Created lazily so importing this module never forks
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_variants(source_path: str, output_dir: str, sizes: list, webp_quality: int) -> Dict[str, Dict[str, str]]:
+    """Resize one image into every size (plus a full-size WebP), writing the files to output_dir.
+    Runs in a worker process."""
+    from PIL import Image  # Imported in the worker so the API process does not need Pillow loaded
+
+    source = Path(source_path)
+    output = Path(output_dir)
+    variants = {}
+    with Image.open(source) as original:
+        original.seek(0)  # First frame of animated GIFs
+        has_alpha = original.mode in ("RGBA", "LA", "P")
+        base = original.convert("RGBA" if has_alpha else "RGB")
+        fallback_ext, fallback_format = ("png", "PNG") if has_alpha else ("jpg", "JPEG")
+
+        for size in sizes:
+            resized = base.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            fallback_name = f"{source.stem}_{size}.{fallback_ext}"
+            webp_name = f"{source.stem}_{size}.webp"
+            resized.save(output / fallback_name, format=fallback_format, optimize=True)
+            resized.save(output / webp_name, format="WEBP", quality=webp_quality)
+            variants[str(size)] = {"url": fallback_name, "webp_url": webp_name}
+
+        full_webp_name = f"{source.stem}.webp"
+        if source.name != full_webp_name:
+            base.save(output / full_webp_name, format="WEBP", quality=webp_quality)
+        variants["original"] = {"url": source.name, "webp_url": full_webp_name}
+    return variants
+
+
+async def generate_profile_variants(user_id: str, source_name: str, profile_picture_url: str):
+    """Background task: render avatar variants off the API process, store them alongside the
+    original and record their URLs on the user."""
+    output_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="skilllink-thumbs-")
+    try:
+        async with storage.local_copy(source_name) as source_path:
+            variants = await asyncio.get_running_loop().run_in_executor(
+                _get_executor(), render_variants, str(source_path), output_dir, THUMBNAIL_SIZES, WEBP_QUALITY
+            )
+        for files in variants.values():
+            for name in files.values():
+                if name != source_name:
+                    # Content-addressed names: put_file skips variants that are already stored
+                    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                    await storage.put_file(Path(output_dir) / name, name, content_type)
+    except Exception as e:
+        logger.warning("thumbnails.render_failed", extra={"user_id": user_id, "error": repr(e)})
+        return
+    finally:
+        await asyncio.to_thread(shutil.rmtree, output_dir, True)
+
+    variant_urls = {
+        key: {field: upload_url(name) for field, name in files.items()}
+        for key, files in variants.items()
+    }
+    # Only attach the variants if the picture has not been replaced in the meantime
+    result = await db["users"].update_one(
+        {"_id": ObjectId(user_id), "profile_picture_url": profile_picture_url},
+        {"$set": {"profile_picture_variants": variant_urls}}
+    )
+    if result.modified_count:
+        await profile_cache.invalidate(user_id)
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from database import db
+from pubsub import broker, PUBSUB_BACKEND, WEB_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Revoked access-token ids (logout) and per-user revocation cut-offs (ban / logout everywhere).
+# Entries only need to outlive the access tokens they cover, so a TTL index expires them.
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+REVOCATION_CHANNEL = "auth:revocations"
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", 100000))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", 0.001))
+# Full rebuild interval; drops expired entries the Bloom filter itself cannot forget
+REVOCATION_REBUILD_SECONDS = int(os.getenv("REVOCATION_REBUILD_SECONDS", 300))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter: no false negatives, tunable false-positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def _user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+class RevocationList:
+    """Bloom filter in front of the revoked_tokens collection.
+
+    A negative filter answer proves the token is not revoked, so the common path stays in memory;
+    only filter hits (real revocations or rare false positives) are confirmed against MongoDB.
+    Workers learn about each other's revocations through the pub/sub broker; with the in-process
+    "memory" broker they only pick them up at the next rebuild, up to REVOCATION_REBUILD_SECONDS later.
+    """
+
+    def __init__(self):
+        self._filter = BloomFilter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
+        self._tasks = []
+
+    async def ensure_indexes(self):
+        await db[REVOKED_TOKENS_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+        await db[REVOKED_TOKENS_COLLECTION].create_index("jti", sparse=True)
+        await db[REVOKED_TOKENS_COLLECTION].create_index([("user_id", 1), ("revoked_at", -1)], sparse=True)
+
+    async def rebuild(self):
+        rebuilt = BloomFilter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
+        async for entry in db[REVOKED_TOKENS_COLLECTION].find({}, {"jti": 1, "user_id": 1}):
+            rebuilt.add(_jti_key(entry["jti"]) if entry.get("jti") else _user_key(entry["user_id"]))
+        self._filter = rebuilt
+
+    async def start(self):
+        if PUBSUB_BACKEND == "memory" and WEB_CONCURRENCY > 1:
+            # Other workers would only see this worker's revocations at their next rebuild
+            logger.warning(
+                "auth.revocations_not_shared",
+                extra={"workers": WEB_CONCURRENCY, "window_seconds": REVOCATION_REBUILD_SECONDS}
+            )
+        await self.rebuild()
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._rebuild_periodically())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _listen(self):
+        async with broker.subscribe(REVOCATION_CHANNEL) as queue:
+            while True:
+                self._filter.add((await queue.get())["key"])
+
+    async def _rebuild_periodically(self):
+        while True:
+            await asyncio.sleep(REVOCATION_REBUILD_SECONDS)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.warning("auth.revocation_rebuild_failed", extra={"error": type(e).__name__})
+
+    async def is_revoked(self, claims: dict) -> bool:
+        jti, user_id = claims.get("jti"), claims["id"]
+        jti_hit = jti is not None and _jti_key(jti) in self._filter
+        user_hit = _user_key(user_id) in self._filter
+        if not (jti_hit or user_hit):
+            return False
+
+        conditions = []
+        if jti_hit:
+            conditions.append({"jti": jti})
+        if user_hit:
+            conditions.append({"user_id": user_id, "revoked_at": {"$gte": claims.get("iat") or 0}})
+        return await db[REVOKED_TOKENS_COLLECTION].find_one({"$or": conditions}, {"_id": 1}) is not None
+
+    async def _record(self, entry: dict, key: str):
+        await db[REVOKED_TOKENS_COLLECTION].insert_one(entry)
+        self._filter.add(key)
+        await broker.publish(REVOCATION_CHANNEL, {"key": key})
+
+    async def revoke_token(self, jti: str, expires_at: Optional[float]):
+        """Revoke a single access token (logout) until it would have expired anyway."""
+        expiry = datetime.fromtimestamp(expires_at, timezone.utc) if expires_at else datetime.now(timezone.utc) + timedelta(days=1)
+        await self._record({"jti": jti, "expires_at": expiry}, _jti_key(jti))
+
+    async def revoke_user(self, user_id: str, access_token_lifetime: timedelta):
+        """Revoke every access token issued to a user up to now (ban / logout everywhere)."""
+        await self._record(
+            {
+                "user_id": user_id,
+                "revoked_at": time.time(),
+                "expires_at": datetime.now(timezone.utc) + access_token_lifetime
+            },
+            _user_key(user_id)
+        )
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,119 @@
+import hashlib
+import os
+from typing import Optional
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from storage import storage, CONTENT_HASH_LENGTH, UPLOAD_CHUNK_BYTES
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+# Routes whose request bodies are capped at the ASGI layer, before multipart parsing spools them
+UPLOAD_PATHS = {"/upload-profile-picture"}
+
+# Leading bytes of the image formats we accept -> (content type, extension)
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ("image/jpeg", "jpg")),
+    (b"\x89PNG\r\n\x1a\n", ("image/png", "png")),
+    (b"GIF87a", ("image/gif", "gif")),
+    (b"GIF89a", ("image/gif", "gif")),
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[tuple]:
+    """Identify an image from its magic bytes instead of trusting the client's content_type."""
+    for signature, kind in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ("image/webp", "webp")
+    return None
+
+
+async def save_image_upload(file: UploadFile) -> str:
+    """Stream an uploaded image into the configured storage backend in chunks and return its name.
+
+    The size cap is enforced while streaming, and the object only becomes visible under its
+    final name once complete, so readers never see a partial file. The name is the SHA-256 of
+    the content, so identical uploads share one stored object.
+    """
+    head = await file.read(UPLOAD_CHUNK_BYTES)
+    kind = sniff_image_type(head)
+    if kind is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only JPEG, PNG, GIF or WebP images are allowed.")
+
+    digest = hashlib.sha256()
+    writer = storage.writer()
+    try:
+        written = 0
+        chunk = head
+        while chunk:
+            written += len(chunk)
+            if written > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit."
+                )
+            digest.update(chunk)
+            await writer.write(chunk)
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+
+        name = f"{digest.hexdigest()[:CONTENT_HASH_LENGTH]}.{kind[1]}"
+        await writer.commit(name, kind[0])
+    except BaseException:
+        await writer.abort()
+        raise
+    return name
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as a 413 instead of a generic 400
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit."
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """Abort upload requests as soon as the body exceeds the cap, instead of after
+    Starlette has spooled the whole multipart body to disk."""
+
+    def __init__(self, app, paths=UPLOAD_PATHS, max_bytes: int = MAX_UPLOAD_BYTES + UPLOAD_CHUNK_BYTES):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes  # Allowance for multipart boundaries and headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        error = _BodyTooLarge()
+        too_large = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await too_large(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await too_large(scope, receive, send)
@@ -1,20 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, BackgroundTasks, Request
+from fastapi.responses import Response
 from database import db
 from schemas import UserCreate, UserOut, UserLogin, UserUpdate
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import hash_password, hash_password_async, create_access_token, get_current_user # hash_password is also imported from here by db/seed_data.py
 import models # Import the models module
 from bson import ObjectId
 from bson.errors import InvalidId
-import shutil
-from pathlib import Path
 from datetime import datetime, timezone
+from uploads import save_image_upload
+from storage import upload_url
+from thumbnails import generate_profile_variants
+from profile_cache import profile_cache, etag_matches
+from reputation import reputation_fields
+from platform_stats import platform_stats, user_counters
+import analytics
 
 router = APIRouter()
 
-# Define the directory for uploads (relative to where main.py is run)
-UPLOAD_DIRECTORY = Path("uploads")
-UPLOAD_DIRECTORY.mkdir(exist_ok=True) # Create directory if it doesn't exist
-
 @router.post("/register", response_model=UserOut)
 async def register_user(user: UserCreate):
     user_exists = await db["users"].find_one({"email": user.email})
@@ -22,11 +24,17 @@ async def register_user(user: UserCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered.")
     
     user_dict = user.model_dump()
-    user_dict["hashed_password"] = hash_password(user_dict.pop("password"))
+    user_dict["hashed_password"] = await hash_password_async(user_dict.pop("password"))
     # Add default created_at if not provided by the model (though models.User has default_factory)
     if "created_at" not in user_dict:
         user_dict["created_at"] = datetime.now(timezone.utc)
+    if user_dict.get("user_type") == "player":
+        # Players are listed in the directory from the start, ranked at the prior
+        user_dict.update(reputation_fields(0, 0))
     new_user = await db["users"].insert_one(user_dict)
+    await platform_stats.increment(**user_counters(user_dict.get("user_type")))
+    if user_dict.get("user_type") in ("player", "org"):
+        await analytics.record(f"new_{user_dict['user_type']}s", at=user_dict["created_at"])
     created_user = await db["users"].find_one({"_id": new_user.inserted_id})
     return models.user_helper(created_user)
 
@@ -35,60 +43,79 @@ async def register_user(user: UserCreate):
 @router.get("/me", response_model=UserOut)
 async def get_my_profile(current_user: models.User = Depends(get_current_user)):
     # Fetch complete user details from database
-    user = await db["users"].find_one({"_id": ObjectId(current_user["id"])})
+    user = await db["users"].find_one({"_id": ObjectId(current_user["id"])}, models.USER_PUBLIC_PROJECTION)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
     return models.user_helper(user)
 
+# Profiles change rarely but are revalidated constantly; clients must check the ETag before reuse
+PROFILE_CACHE_CONTROL = "public, no-cache"
+
+async def _public_profile_response(request: Request, object_id: ObjectId, user_type: str = None) -> Response:
+    """Serve a public profile from the per-worker cache, answering 304 when the client's ETag still matches."""
+    user_id = str(object_id)
+    cached = profile_cache.get(user_id)
+    if cached is None:
+        user = await db["users"].find_one({"_id": object_id}, models.USER_PUBLIC_PROJECTION)
+        if not user:
+            return None
+        body = UserOut(**models.user_helper(user)).model_dump_json().encode()
+        cached = profile_cache.put(user_id, body, user.get("user_type"))
+
+    body, etag, cached_user_type, _ = cached
+    if user_type is not None and cached_user_type != user_type:
+        return None
+
+    headers = {"ETag": etag, "Cache-Control": PROFILE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/users/{user_id}", response_model=UserOut)
-async def get_user_profile(user_id: str):
+async def get_user_profile(user_id: str, request: Request):
     try:
         user_object_id = ObjectId(user_id)
     except InvalidId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid User ID format")
 
-    user = await db["users"].find_one({"_id": user_object_id})
-    if not user:
+    response = await _public_profile_response(request, user_object_id)
+    if response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-    
-    return models.user_helper(user)
+    return response
 
 @router.get("/orgs/{org_id}", response_model=UserOut)
-async def get_org_profile(org_id: str):
+async def get_org_profile(org_id: str, request: Request):
     try:
         org_object_id = ObjectId(org_id)
     except InvalidId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Org ID format")
 
-    user = await db["users"].find_one({"_id": org_object_id})
-    if not user or user["user_type"] != "org":
+    response = await _public_profile_response(request, org_object_id, user_type="org")
+    if response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found.")
-
-    return models.user_helper(user)
+    return response
 
 @router.post("/upload-profile-picture", response_model=dict)
-async def upload_profile_picture(current_user: models.User = Depends(get_current_user), file: UploadFile = File(...)):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only image files are allowed.")
-
-    file_extension = file.filename.split(".")[-1]
-    file_name = f"{current_user['id']}_profile.{file_extension}"
-    file_path = UPLOAD_DIRECTORY / file_name
-
+async def upload_profile_picture(background_tasks: BackgroundTasks, current_user: models.User = Depends(get_current_user), file: UploadFile = File(...)):
+    # Request bodies are capped by UploadSizeLimitMiddleware; the file itself is capped again while copying
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_name = await save_image_upload(file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not upload file: {e}")
     finally:
-        file.file.close()
+        await file.close()
 
-    file_url = f"http://127.0.0.1:8000/uploads/{file_name}"
+    file_url = upload_url(file_name)
     
     await db["users"].update_one(
         {"_id": ObjectId(current_user["id"])},
-        {"$set": {"profile_picture_url": file_url}}
+        {"$set": {"profile_picture_url": file_url, "profile_picture_variants": None}}
     )
+    await profile_cache.invalidate(current_user["id"])
+    # Resized/WebP variants are rendered in a process pool after the response is sent
+    background_tasks.add_task(generate_profile_variants, current_user["id"], file_name, file_url)
 
     return {"message": "File uploaded successfully", "file_url": file_url}
 
@@ -111,30 +138,16 @@ async def update_my_profile(update: UserUpdate, current_user: models.User = Depe
         update_data["socials"] = cleaned_socials if cleaned_socials else None
 
     result = await db["users"].update_one({"_id": ObjectId(current_user["id"])}, {"$set": update_data})
+    await profile_cache.invalidate(current_user["id"])
     if result.modified_count == 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Profile not updated. No changes made.")
     # Ensure we get the latest data after update
-    updated_user = await db["users"].find_one({"_id": ObjectId(current_user["id"])})
+    updated_user = await db["users"].find_one({"_id": ObjectId(current_user["id"])}, models.USER_PUBLIC_PROJECTION)
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found after update.")
     return models.user_helper(updated_user)
 
 @router.get("/admin/stats")
 async def get_admin_stats():
-    users_total = await db["users"].count_documents({})
-    players = await db["users"].count_documents({"user_type": "player"})
-    orgs = await db["users"].count_documents({"user_type": "org"})
-    gigs = await db["gigs"].count_documents({})
-    applications = await db["applications"].count_documents({})
-    endorsements = await db["endorsements"].count_documents({})
-    nfts = await db["soulbound_nfts"].count_documents({})
-
-    return {
-        "users_total": users_total,
-        "players": players,
-        "orgs": orgs,
-        "gigs": gigs,
-        "applications": applications,
-        "endorsements": endorsements,
-        "nfts_minted": nfts
-    }
+    # Materialized counters, cached in memory for PLATFORM_STATS_TTL_SECONDS
+    return await platform_stats.get()
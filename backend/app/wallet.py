@@ -6,6 +6,7 @@ from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime, timezone
 from typing import List, Optional
+import analytics
 
 router = APIRouter()
 
@@ -351,6 +352,7 @@ async def process_payment(
             "created_at": datetime.now(timezone.utc)
         }
         await db["wallet_transactions"].insert_one(player_transaction)
+        await analytics.record("gmv", amount, at=player_transaction["created_at"])
         
         if org_wallet:
             org_transaction = {
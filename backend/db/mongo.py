@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "versatile_db")
+
+# Pool sizing: each worker process gets its own pool, so size it for one worker's concurrency
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+# How long a request waits for a free connection before failing fast instead of piling up
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+# Comma-separated, in preference order: zstd (needs zstandard), snappy (needs python-snappy), zlib
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+# e.g. "local", "majority"; empty keeps the server default
+MONGO_READ_CONCERN = os.getenv("MONGO_READ_CONCERN", "")
+# e.g. "majority" or a node count such as "1"; empty keeps the server default
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "")
+MONGO_WRITE_CONCERN_JOURNAL = os.getenv("MONGO_WRITE_CONCERN_JOURNAL", "")
+# Connections opened at startup so the first requests do not pay for TCP/TLS/auth handshakes
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", MONGO_MIN_POOL_SIZE))
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events. PyMongo calls listeners from its own threads, hence the lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pool_clears = 0
+
+    def _bump(self, field: str, delta: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump("pool_clears")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        # reason is "timeout" when the wait queue timeout is hit: the pool is too small
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._bump("checked_out", -1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_connections": self.created - self.closed,
+                "in_use": self.checked_out,
+                "connections_created": self.created,
+                "connections_closed": self.closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+            }
+
+
+def _client_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "retryWrites": True,
+        "retryReads": True,
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+def _database_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if MONGO_READ_CONCERN:
+        options["read_concern"] = ReadConcern(MONGO_READ_CONCERN)
+    if MONGO_WRITE_CONCERN or MONGO_WRITE_CONCERN_JOURNAL:
+        w = MONGO_WRITE_CONCERN or None
+        options["write_concern"] = WriteConcern(
+            w=int(w) if w and w.isdigit() else w,
+            j=MONGO_WRITE_CONCERN_JOURNAL.lower() == "true" if MONGO_WRITE_CONCERN_JOURNAL else None
+        )
+    return options
+
+
+class MongoConnectionManager:
+    """Owns the process's single Motor client.
+
+    The client is created on first use (so scripts work without any setup) or explicitly by
+    connect() in the FastAPI lifespan, which also warms the pool; close() releases it on shutdown.
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._database: Optional[AsyncIOMotorDatabase] = None
+        self.pool_listener = PoolStatsListener()
+
+    def _ensure_client(self):
+        if self._client is None:
+            self._client = AsyncIOMotorClient(MONGO_URL, event_listeners=[self.pool_listener], **_client_options())
+            self._database = self._client.get_database(MONGO_DB_NAME, **_database_options())
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        self._ensure_client()
+        return self._client
+
+    @property
+    def database(self) -> AsyncIOMotorDatabase:
+        self._ensure_client()
+        return self._database
+
+    async def connect(self, warmup_connections: int = MONGO_WARMUP_CONNECTIONS):
+        """Create the client and open warmup_connections connections concurrently."""
+        await self.client.admin.command("ping")
+        if warmup_connections > 1:
+            # Concurrent pings each need their own connection, so the pool fills up to this size
+            await asyncio.gather(*(
+                self.client.admin.command("ping") for _ in range(min(warmup_connections, MONGO_MAX_POOL_SIZE))
+            ))
+        logger.info("mongo.connected", extra={"pool": self.pool_listener.stats()})
+
+    async def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._database = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self._client is not None,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "wait_queue_timeout_ms": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "compressors": MONGO_COMPRESSORS or None,
+            **self.pool_listener.stats(),
+        }
+
+
+class DatabaseProxy:
+    """Stands in for the Motor database so modules can keep `from database import db` at import
+    time while the client itself is created (and recreated) by the connection manager."""
+
+    def __init__(self, manager: MongoConnectionManager):
+        self._manager = manager
+
+    def __getitem__(self, name: str):
+        return self._manager.database[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self._manager.database, name)
+
+
+mongo = MongoConnectionManager()
+db = DatabaseProxy(mongo)
+
+
+async def test_mongo_connection():
+    """Test MongoDB connection"""
+    try:
+        # Ping the database
+        await mongo.client.admin.command('ping')
+        print("✅ MongoDB connection successful!")
+        return True
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        return False
+
+
+def get_database():
+    """Get MongoDB database instance"""
+    return db
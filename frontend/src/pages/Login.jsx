@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { Link, useNavigate } from "react-router-dom";
-import { isAuthenticated, getUserType } from "../utils/auth";
+import { isAuthenticated, getUserType, storeTokens } from "../utils/auth";
 import { isValidToken, secureStorage, sanitizeInput, generateSafeError } from '../utils/security';
 
 function Login() {
@@ -86,9 +86,11 @@ function Login() {
           secureStorage.removeItem('access_token');
           throw new Error('Failed to store user type');
         }
+        storeTokens(data); // Keeps the refresh token and schedules renewal
       } catch (jwtError) {
         console.error("Error decoding JWT:", jwtError);
         secureStorage.removeItem('access_token');
+        secureStorage.removeItem('refresh_token');
         secureStorage.removeItem('user_type');
         throw new Error("Login successful, but failed to process user data. Please try again.");
       }
@@ -11,9 +11,44 @@ function Messages() {
   const [messages, setMessages] = useState([]); // State for messages of the active chat
   const [messageInput, setMessageInput] = useState('');
   const [loadingConversations, setLoadingConversations] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null); // Cursor for the next page of conversations
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loadingMessages, setLoadingMessages] = useState(false);
   const [error, setError] = useState(null);
 
+  // --- Fetch one page of conversations; the API returns the next page's cursor in X-Next-Cursor ---
+  const fetchConversationPage = async (token, cursor = null) => {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${import.meta.env.VITE_API_BASE_URL}/conversations${query}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+
+    if (!response.ok) {
+      const errorDetail = await response.json();
+      throw new Error(errorDetail.detail || `Failed to fetch conversations: ${response.status}`);
+    }
+    return { data: await response.json(), cursor: response.headers.get('X-Next-Cursor') };
+  };
+
+  const handleLoadMoreConversations = async () => {
+    const token = secureStorage.getItem('access_token');
+    if (!nextCursor || !token) {
+      return;
+    }
+
+    setLoadingMore(true);
+    try {
+      const { data, cursor } = await fetchConversationPage(token, nextCursor);
+      setConversations(prev => [...prev, ...data.filter(convo => !prev.some(p => p.id === convo.id))]);
+      setNextCursor(cursor);
+    } catch (err) {
+      console.error("Error fetching more conversations:", err);
+      setError(err.message || "Failed to load conversations.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // --- Fetch conversations for the logged-in user ---
   useEffect(() => {
     const fetchConversations = async () => {
@@ -30,17 +65,10 @@ function Messages() {
       }
 
       try {
-        const response = await fetch(`${import.meta.env.VITE_API_BASE_URL}/conversations`, {
-          headers: { 'Authorization': `Bearer ${token}` }
-        });
-
-        if (!response.ok) {
-          const errorDetail = await response.json();
-          throw new Error(errorDetail.detail || `Failed to fetch conversations: ${response.status}`);
-        }
-        const data = await response.json();
+        const { data, cursor } = await fetchConversationPage(token);
         console.log("Fetched Conversations:", data);
         setConversations(data);
+        setNextCursor(cursor);
         
         // Automatically select the first conversation if available
         if (data.length > 0) {
@@ -95,7 +123,7 @@ function Messages() {
         // Update the unread status in the conversations state locally
         setConversations(prevConvos => 
           prevConvos.map(convo => 
-            convo.id === activeChat ? { ...convo, unread: false } : convo
+            convo.id === activeChat ? { ...convo, unread_count: 0 } : convo
           )
         );
 
@@ -172,19 +200,11 @@ function Messages() {
   // Helper to get participant's display name and avatar (excluding current user)
   const getChatPartnerInfo = (convo) => {
     const currentUserId = isAuthenticated() ? sessionStorage.getItem('user_id') : null;
-    const partnerId = convo.participants.find(pId => pId !== currentUserId);
-    
-    // In a real app, you'd fetch partner details from /users/{partnerId}
-    // For now, use a placeholder based on ID or fetched user data
-    if (partnerId) {
-      // You'd need a way to map partnerId to username and avatar
-      // For seed data, org1@example.com is 'GamingOrgX', john.doe@example.com is 'john_doe'
-      if (partnerId === "68851116b8bf8f0ec373f40a") return { name: "GamingOrgX", avatar: "GX" };
-      if (partnerId === "68851116b8bf8f0ec373f40b") return { name: "EsportsTeamY", avatar: "EY" };
-      if (partnerId === "68851116b8bf8f0ec373f40c") return { name: "ContentCreatorsZ", avatar: "CZ" };
-      if (partnerId === "68851116b8bf8f0ec373f40d") return { name: "john_doe", avatar: "JD" };
-      if (partnerId === "68851116b8bf8f0ec373f40e") return { name: "jane_smith", avatar: "JS" };
-      return { name: `User ${partnerId.substring(0,4)}`, avatar: partnerId.substring(0,2).toUpperCase() };
+    const partner = (convo.participant_details || []).find(p => p.id !== currentUserId);
+
+    if (partner) {
+      const name = partner.username || `User ${partner.id.substring(0,4)}`;
+      return { name, avatar: name.substring(0,2).toUpperCase(), pictureUrl: partner.profile_picture_url };
     }
     return { name: "Unknown User", avatar: "??" };
   };
@@ -246,12 +266,12 @@ function Messages() {
                       <div className="flex-grow">
                         <div className="flex justify-between items-center">
                           <h3 className="font-medium text-dark-50">{partnerInfo.name}</h3>
-                          <span className="text-xs text-dark-300">{convo.time}</span>
+                          <span className="text-xs text-dark-300">{convo.last_message ? new Date(convo.last_message.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }) : ''}</span>
                         </div>
                         
                         <div className="flex justify-between items-center">
-                          <p className="text-sm text-dark-200 truncate">{convo.lastMessage}</p>
-                          {convo.unread && (
+                          <p className="text-sm text-dark-200 truncate">{convo.last_message?.text}</p>
+                          {convo.unread_count > 0 && (
                             <span className="w-2 h-2 rounded-full bg-primary-500"></span>
                           )}
                         </div>
@@ -261,6 +281,18 @@ function Messages() {
                 );
               })}
             </div>
+
+            {nextCursor && (
+              <div className="p-4 border-t border-dark-700 text-center">
+                <button
+                  onClick={handleLoadMoreConversations}
+                  disabled={loadingMore}
+                  className="text-sm text-primary-500 hover:text-primary-400 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load older conversations'}
+                </button>
+              </div>
+            )}
           </div>
           
           {/* Chat Window */}
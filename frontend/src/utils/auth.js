@@ -23,9 +23,115 @@ export const isAuthenticated = () => {
   return true;
 };
 
+// --- Access token renewal ---
+// Access tokens are short-lived; the rotating refresh token from /auth/login renews them.
+// Each refresh token can be used once, so concurrent renewals share one request.
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const REFRESH_MARGIN_MS = 60 * 1000; // Renew this long before the access token expires
+
+const originalFetch = window.fetch.bind(window);
+let refreshInFlight = null;
+let refreshTimer = null;
+
+const tokenExpiry = (token) => {
+  try {
+    return JSON.parse(atob(token.split('.')[1])).exp * 1000;
+  } catch {
+    return 0;
+  }
+};
+
+const scheduleRefresh = () => {
+  clearTimeout(refreshTimer);
+  const token = secureStorage.getItem('access_token');
+  if (!token || !secureStorage.getItem('refresh_token')) return;
+  const delay = Math.max(tokenExpiry(token) - Date.now() - REFRESH_MARGIN_MS, 0);
+  refreshTimer = setTimeout(() => { refreshAccessToken(); }, delay);
+};
+
+// Store the token pair returned by /auth/login or /auth/refresh
+export const storeTokens = (data) => {
+  secureStorage.setItem('access_token', data.access_token);
+  if (data.refresh_token) {
+    secureStorage.setItem('refresh_token', data.refresh_token);
+  }
+  scheduleRefresh();
+};
+
+// Exchange the refresh token for a new pair; resolves to the new access token or null
+export const refreshAccessToken = () => {
+  if (refreshInFlight) return refreshInFlight;
+  const refreshToken = secureStorage.getItem('refresh_token');
+  if (!refreshToken || !isValidToken(refreshToken)) return Promise.resolve(null);
+
+  refreshInFlight = (async () => {
+    try {
+      const response = await originalFetch(`${API_BASE_URL}/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+        body: new URLSearchParams({ refresh_token: refreshToken })
+      });
+      if (!response.ok) {
+        logout(); // Refresh token expired, revoked or already used
+        return null;
+      }
+      const data = await response.json();
+      storeTokens(data);
+      return data.access_token;
+    } catch (err) {
+      console.error('Failed to refresh access token');
+      return null;
+    } finally {
+      refreshInFlight = null;
+    }
+  })();
+  return refreshInFlight;
+};
+
+// Retry authenticated API calls once with a renewed token when the server answers 401
+const fetchWithRefresh = async (input, init = {}) => {
+  const url = typeof input === 'string' ? input : input.url;
+  const headers = new Headers(init.headers || (typeof input === 'string' ? undefined : input.headers));
+  const response = await originalFetch(input, init);
+  if (
+    response.status !== 401 ||
+    !url.startsWith(API_BASE_URL) ||
+    url.startsWith(`${API_BASE_URL}/auth/`) ||
+    !(headers.get('Authorization') || '').startsWith('Bearer ')
+  ) {
+    return response;
+  }
+  const token = await refreshAccessToken();
+  if (!token) return response;
+  headers.set('Authorization', `Bearer ${token}`);
+  return originalFetch(input, { ...init, headers });
+};
+
+// Install the 401 retry for every page's fetch calls and renew a session whose access
+// token expired while the app was closed; resolves once the stored token is usable
+export const installTokenRefresh = async () => {
+  window.fetch = fetchWithRefresh;
+  document.addEventListener('visibilitychange', () => {
+    // Timers are throttled in background tabs, so re-check when the tab comes back
+    if (document.visibilityState !== 'visible') return;
+    const token = secureStorage.getItem('access_token');
+    if (token && tokenExpiry(token) - Date.now() < REFRESH_MARGIN_MS) {
+      refreshAccessToken();
+    }
+  });
+  const token = secureStorage.getItem('access_token');
+  if (token && tokenExpiry(token) - Date.now() < REFRESH_MARGIN_MS) {
+    await refreshAccessToken();
+  } else {
+    scheduleRefresh();
+  }
+};
+
 // Secure logout with full cleanup
 export const logout = () => {
-  // Clear all sensitive data
+  clearTimeout(refreshTimer);
+
+  // Clear all sensitive data, including the refresh token
   secureStorage.clear();
   
   // Clear any additional stored data